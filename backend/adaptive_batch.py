@@ -0,0 +1,205 @@
+import os
+import json
+import math
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .db import execute, fetchall
+
+SUM_ADAPTIVE_BATCHING = os.getenv("SUM_ADAPTIVE_BATCHING", "1") != "0"
+# Rough prompt size estimate: characters per token, plus per-item markers and the expected summary
+SUM_CHARS_PER_TOKEN = float(os.getenv("SUM_CHARS_PER_TOKEN", "4"))
+SUM_ITEM_OVERHEAD_TOKENS = int(os.getenv("SUM_ITEM_OVERHEAD_TOKENS", "48"))
+# Batches slower than this shrink proportionally
+SUM_TARGET_BATCH_SECONDS = float(os.getenv("SUM_TARGET_BATCH_SECONDS", "30"))
+# Share of failed or mismatched items in a batch that still counts as a good batch
+SUM_BATCH_FAILURE_TOLERANCE = float(os.getenv("SUM_BATCH_FAILURE_TOLERANCE", "0.1"))
+# Size of the first batches for a backend/model with no history
+SUM_START_BATCH_ITEMS = int(os.getenv("SUM_START_BATCH_ITEMS", "10"))
+# Weight of the newest batch in the moving averages
+_EWMA_ALPHA = 0.3
+# Per-item allowance counted against the character cap, as in chunk_batches
+_ITEM_MARKER_CHARS = 64
+
+
+def estimate_tokens(text: str) -> int:
+	return math.ceil(len(text) / SUM_CHARS_PER_TOKEN) + SUM_ITEM_OVERHEAD_TOKENS
+
+
+class BatchTuning:
+	"""Learned batch limits and recent behaviour for one backend/model."""
+
+	def __init__(self, max_items: float, max_tokens: float) -> None:
+		self.max_items = max_items
+		self.max_tokens = max_tokens
+		# Below this size batches grow x1.5 (slow start); above it, additively
+		self.growth_threshold: Optional[float] = None
+		self.batches = 0
+		self.seconds_per_token: Optional[float] = None
+		self.failure_rate = 0.0
+		self.mismatch_rate = 0.0
+
+	def to_dict(self) -> Dict[str, Any]:
+		return dict(self.__dict__)
+
+	@classmethod
+	def from_dict(cls, data: Dict[str, Any]) -> "BatchTuning":
+		tuning = cls(data["max_items"], data["max_tokens"])
+		for k, v in data.items():
+			if hasattr(tuning, k):
+				setattr(tuning, k, v)
+		return tuning
+
+
+class AdaptiveBatcher:
+	"""Size summarization batches per backend/model by estimated tokens, learning from each batch (AIMD).
+
+	Good batches grow the limits (x1.5 until the first failure, then by small
+	additive steps); parse failures, high item-failure or positional-mismatch
+	rates halve them, and slow batches shrink toward SUM_TARGET_BATCH_SECONDS.
+	Learned limits are persisted in the ``batch_tuning`` table; ``record`` runs
+	on the summarization event loop, so it only updates memory there and leaves
+	the write to a single background thread (which keeps writes in order).
+	"""
+
+	def __init__(self, max_items_cap: int, max_tokens_cap: int, max_chars_cap: int = 0) -> None:
+		self.max_items_cap = max(1, max_items_cap)
+		self.max_tokens_cap = max(SUM_ITEM_OVERHEAD_TOKENS, max_tokens_cap)
+		# Hard character cap, counted like chunk_batches (0 = none)
+		self.max_chars_cap = max_chars_cap
+		self._states: Dict[str, BatchTuning] = {}
+		self._loaded = False
+		self._lock = threading.Lock()
+		self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="batch-tuning")
+
+	@staticmethod
+	def _key(backend: str, model: str) -> str:
+		return f"{backend}:{model}"
+
+	def _load(self) -> None:
+		"""Read every persisted state once, so later lookups (also from the event loop) never touch the database."""
+		try:
+			rows = fetchall("SELECT key, state FROM batch_tuning")
+		except Exception as e:
+			print(f"⚠️ BATCH TUNING: could not load learned states: {e}")
+			return
+		self._loaded = True
+		for r in rows:
+			if r["state"] and r["key"] not in self._states:
+				self._states[r["key"]] = BatchTuning.from_dict(json.loads(r["state"]))
+
+	def _state(self, backend: str, model: str) -> BatchTuning:
+		if not self._loaded:
+			self._load()
+		key = self._key(backend, model)
+		state = self._states.get(key)
+		if state is None:
+			state = self._states[key] = BatchTuning(min(SUM_START_BATCH_ITEMS, self.max_items_cap), self.max_tokens_cap)
+		# Config caps may have been lowered since the state was learned
+		state.max_items = max(1.0, min(state.max_items, self.max_items_cap))
+		state.max_tokens = max(float(SUM_ITEM_OVERHEAD_TOKENS), min(state.max_tokens, self.max_tokens_cap))
+		return state
+
+	def batches(self, items: List[Tuple[str, str]], backend: str, model: str) -> Iterator[List[Tuple[str, str]]]:
+		"""Yield batches lazily; each one is sized from the limits learned so far."""
+		idx = 0
+		while idx < len(items):
+			with self._lock:
+				state = self._state(backend, model)
+				max_items, max_tokens = int(state.max_items), state.max_tokens
+			cur: List[Tuple[str, str]] = []
+			tokens = 0
+			chars = 0
+			while idx < len(items) and len(cur) < max_items:
+				cid, text = items[idx]
+				t = estimate_tokens(text)
+				c = len(text) + _ITEM_MARKER_CHARS
+				if cur and (tokens + t > max_tokens or (self.max_chars_cap and chars + c > self.max_chars_cap)):
+					break
+				cur.append((cid, text))
+				tokens += t
+				chars += c
+				idx += 1
+			yield cur
+
+	def record(self, backend: str, model: str, batch: List[Tuple[str, str]], seconds: float, failed: int = 0, mismatched: int = 0, error: bool = False, retry: bool = False) -> None:
+		"""Learn from one request: ``failed`` items without a usable summary, ``mismatched`` items whose
+		position did not line up with the expected id, ``error`` for a request or parse failure.
+
+		Retries of a batch's failed items only update the moving averages; they are
+		a biased sample of hard items and say little about the right batch size.
+		"""
+		if not batch:
+			return
+		n = len(batch)
+		tokens = sum(estimate_tokens(text) for _, text in batch)
+		with self._lock:
+			state = self._state(backend, model)
+			state.batches += 1
+			failure = 1.0 if error else failed / n
+			mismatch = mismatched / n
+			state.failure_rate = _EWMA_ALPHA * failure + (1 - _EWMA_ALPHA) * state.failure_rate
+			state.mismatch_rate = _EWMA_ALPHA * mismatch + (1 - _EWMA_ALPHA) * state.mismatch_rate
+			if not error:
+				spt = seconds / max(1, tokens)
+				state.seconds_per_token = spt if state.seconds_per_token is None else _EWMA_ALPHA * spt + (1 - _EWMA_ALPHA) * state.seconds_per_token
+
+			# Only react to batches that actually reached the current limits
+			full = n >= int(state.max_items) or tokens >= 0.8 * state.max_tokens
+			# Batches launched before the last decrease (larger than the limit now) were already accounted for
+			stale = n > int(state.max_items) and tokens > state.max_tokens
+			if retry:
+				action = "keep (retry)"
+			elif error or failure > SUM_BATCH_FAILURE_TOLERANCE or mismatch > SUM_BATCH_FAILURE_TOLERANCE:
+				if stale:
+					action = "keep (already shrunk)"
+				else:
+					state.growth_threshold = max(1.0, min(state.max_items, n) / 2)
+					state.max_items = max(1.0, min(state.max_items, n) / 2)
+					state.max_tokens = max(float(SUM_ITEM_OVERHEAD_TOKENS), min(state.max_tokens, tokens) / 2)
+					action = "shrink"
+			elif seconds > SUM_TARGET_BATCH_SECONDS and not stale:
+				scale = max(0.5, SUM_TARGET_BATCH_SECONDS / seconds)
+				state.max_tokens = max(float(SUM_ITEM_OVERHEAD_TOKENS), min(state.max_tokens, tokens) * scale)
+				state.max_items = max(1.0, min(state.max_items, n) * scale)
+				action = "slow"
+			elif full:
+				if state.growth_threshold is None or state.max_items < state.growth_threshold:
+					state.max_items *= 1.5
+					state.max_tokens *= 1.5
+				else:
+					state.max_items += 2
+					state.max_tokens *= 1.1
+				state.max_items = min(state.max_items, float(self.max_items_cap))
+				state.max_tokens = min(state.max_tokens, float(self.max_tokens_cap))
+				action = "grow"
+			else:
+				action = "keep"
+			data = state.to_dict()
+		print(f"🔍 BATCH TUNING: {backend}/{model} {n} items, ~{tokens} tokens, {seconds:.1f}s, failed={failed}, mismatched={mismatched}, error={error} -> {action} (max_items={data['max_items']:.1f}, max_tokens={data['max_tokens']:.0f})")
+		try:
+			asyncio.get_running_loop()
+		except RuntimeError:
+			self._persist(backend, model, data)
+		else:
+			# Keep SQLite off the event loop shared by all in-flight batches
+			self._writer.submit(self._persist, backend, model, data)
+
+	def _persist(self, backend: str, model: str, data: Dict[str, Any]) -> None:
+		try:
+			execute(
+				"INSERT OR REPLACE INTO batch_tuning (key, backend, model, state, updated_at) VALUES (?, ?, ?, ?, ?)",
+				(self._key(backend, model), backend, model, json.dumps(data), datetime.utcnow().replace(microsecond=0).isoformat() + "Z"),
+			)
+		except Exception as e:
+			print(f"⚠️ BATCH TUNING: could not persist state for {backend}/{model}: {e}")
+
+	def snapshot(self) -> Dict[str, Dict[str, Any]]:
+		"""Learned state for every backend/model seen, including ones not used by this process yet."""
+		states = {r["key"]: json.loads(r["state"]) for r in fetchall("SELECT key, state FROM batch_tuning") if r["state"]}
+		with self._lock:
+			states.update({key: state.to_dict() for key, state in self._states.items()})
+		return states
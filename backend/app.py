@@ -2,11 +2,14 @@ import os
 import io
 import json
 import csv
+import time
 import uuid
+import shutil
+import threading
 from datetime import datetime, timezone
 from pathlib import Path
 from statistics import mean
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator, BinaryIO
 from xml.sax.saxutils import escape
 
 from dotenv import load_dotenv
@@ -20,14 +23,23 @@ from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTa
 from fastapi.responses import JSONResponse, StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 import base64
 
 from .db import init_db, execute, executemany, fetchone, fetchall
 from .models import AnalysisStatus, SummaryStatus
-from .schemas import AnalysisOut, CommentOut
-from .utils import parse_files_to_comments, clean_text, compute_sentiment_counts, safe_json_dumps
-from .sentiment import SentimentAnalyzer
-from .summarizer import GeminiSummarizer, OllamaSummarizer
+from .schemas import RelabelRequest, SentimentRequest, SentimentResponse
+from .utils import iter_files_to_comments, iter_saved_uploads, iter_batches, save_upload, INGEST_BATCH_SIZE, clean_text
+from .sentiment import SentimentAnalyzer, SENTIMENT_CHUNK_SIZE, relabel_probs, unpack_probs
+from .sentiment_pool import create_sentiment_analyzer
+from .model_manager import SentimentModelManager, SENTIMENT_PRELOAD
+from .microbatch import SentimentMicroBatcher
+from .summarizer import GeminiSummarizer, OllamaSummarizer, PROMPT_RULES_VERSION, SUM_MAX_WORDS, batch_tuner
+from .async_engine import get_engine
+from .hedging import HedgedSummarizer, backend_health
+from .extractive import ExtractiveSummarizer, SUM_LOCAL_MAX_WORDS, route_local
+from .summarizer_registry import SUMMARIZER_PRELOAD, SummarizerRegistry
+from .cache import SUMMARY_CACHE_ENABLED, summary_cache_key, get_cached_summaries, put_cached_summaries
 
 HOST = os.getenv("HOST", "0.0.0.0")
 PORT = int(os.getenv("PORT", "8000"))
@@ -73,106 +85,140 @@ if Path(STATIC_DIR).exists():
 if Path(DATA_DIR).exists():
 	app.mount("/data", StaticFiles(directory=DATA_DIR), name="data")
 
-sentiment_analyzer: Optional[SentimentAnalyzer] = None
-sentiment_analyzers: Dict[str, SentimentAnalyzer] = {}
-summarizer: Optional[object] = None
-summarizer_error: Optional[str] = None
+sentiment_models = SentimentModelManager(create_sentiment_analyzer)
+sentiment_batcher = SentimentMicroBatcher(sentiment_models)
+# Shared, warm summarizer backends (built once, health-checked in the background)
+summarizers = SummarizerRegistry({"gemini": GeminiSummarizer, "ollama": OllamaSummarizer, "local": ExtractiveSummarizer})
 
 
 @app.on_event("startup")
 async def startup_event() -> None:
+	t0 = time.perf_counter()
 	init_db()
-	global sentiment_analyzer, sentiment_analyzers, summarizer, summarizer_error
-	# Load only the default sentiment analyzer (RoBERTa)
-	try:
-		sentiment_analyzers["roberta"] = SentimentAnalyzer("roberta")
-		sentiment_analyzer = sentiment_analyzers["roberta"]  # Default
-		print("✅ Default sentiment analyzer (RoBERTa) loaded successfully")
-	except Exception as e:
-		print(f"❌ Error loading default sentiment analyzer: {e}")
-		sentiment_analyzer = None
-	
-	summarizer_error = None
+	t1 = time.perf_counter()
+	# Load and warm up configured sentiment models in the background so startup is not blocked
+	sentiment_models.preload(SENTIMENT_PRELOAD)
+	t2 = time.perf_counter()
+
 	_normalize_env_keys()
-	try:
-		if os.getenv("GEMINI_API_KEY"):
-			summarizer = GeminiSummarizer()
-		else:
-			summarizer = None
-	except Exception as e:
-		summarizer_error = str(e)
-		summarizer = None
+	# Build and warm summarizer backends in the background; Gemini only once a key is configured
+	summarizers.start([b for b in SUMMARIZER_PRELOAD if b != "gemini" or os.getenv("GEMINI_API_KEY")])
+
+	# Pick up analyses interrupted by a restart without blocking startup
+	threading.Thread(target=resume_interrupted_analyses, name="resume-analyses", daemon=True).start()
+	t3 = time.perf_counter()
+	print(
+		f"⏱️ Startup finished in {t3 - t0:.2f}s (db {t1 - t0:.2f}s, preload scheduling {t2 - t1:.2f}s, summarizer {t3 - t2:.2f}s); "
+		f"sentiment models {', '.join(SENTIMENT_PRELOAD) or 'none'} loading in background"
+	)
+
+
+@app.on_event("shutdown")
+def shutdown_event() -> None:
+	# Release loaded models and stop sentiment worker processes, if any
+	sentiment_batcher.close()
+	sentiment_models.close()
+	# Stop summarizer health checks, close pooled connections and stop the engine loop
+	summarizers.close()
+	get_engine().close()
 
 
 @app.get("/health")
 def health() -> Dict[str, Any]:
 	key = os.getenv("GEMINI_API_KEY") or ""
+	gemini = summarizers.peek("gemini")
 	return {
 		"status": "ok",
-		"summarizer": summarizer.__class__.__name__ if summarizer else None,
+		"summarizer": gemini.__class__.__name__ if gemini else None,
 		"gemini_key_present": bool(key),
 		"gemini_key_prefix": key[:4] if key else None,
 		"dotenv_path": str(DOTENV_PATH),
-		"summarizer_error": summarizer_error,
+		"summarizer_error": summarizers.error("gemini"),
+		"summarizers": summarizers.status(),
 	}
 
 
 @app.post("/admin/reload_env")
 def reload_env():
-	global summarizer, summarizer_error
 	loaded = load_dotenv(dotenv_path=str(DOTENV_PATH), override=True)
 	_normalize_env_keys()
-	summarizer_error = None
-	try:
-		if os.getenv("GEMINI_API_KEY"):
-			summarizer = GeminiSummarizer()
-		else:
-			summarizer = None
-	except Exception as e:
-		summarizer_error = str(e)
-		summarizer = None
-	return {"reloaded": bool(loaded), "summarizer": summarizer.__class__.__name__ if summarizer else None}
+	# Rebuild backends with the new settings; model listings are fetched again
+	summarizers.invalidate()
+	if os.getenv("GEMINI_API_KEY"):
+		try:
+			summarizers.get("gemini")
+		except RuntimeError:
+			pass
+	gemini = summarizers.peek("gemini")
+	return {"reloaded": bool(loaded), "summarizer": gemini.__class__.__name__ if gemini else None}
 
 
 @app.post("/admin/force_gemini")
 def force_gemini():
-	global summarizer, summarizer_error
 	_normalize_env_keys()
+	summarizers.invalidate("gemini")
 	try:
-		summarizer = GeminiSummarizer()
-		summarizer_error = None
+		summarizers.get("gemini")
 		return {"ok": True, "summarizer": "GeminiSummarizer"}
-	except Exception as e:
-		summarizer_error = str(e)
-		raise HTTPException(status_code=500, detail=f"Gemini init failed: {e}")
+	except RuntimeError:
+		raise HTTPException(status_code=500, detail=f"Gemini init failed: {summarizers.error('gemini')}")
 
 
 @app.post("/admin/load_sentiment_model")
 def load_sentiment_model(model_type: str = Form(...)):
-	global sentiment_analyzers
-	if model_type not in ["roberta", "distilbert"]:
-		raise HTTPException(status_code=400, detail="Invalid model type. Must be 'roberta' or 'distilbert'")
+	if model_type not in ["roberta", "distilbert", "cascade"]:
+		raise HTTPException(status_code=400, detail="Invalid model type. Must be 'roberta', 'distilbert' or 'cascade'")
 	
-	if model_type in sentiment_analyzers:
+	if model_type in sentiment_models.loaded_models():
 		return {"ok": True, "model": model_type, "message": "Model already loaded"}
 	
 	try:
-		print(f"🔄 Loading sentiment model: {model_type}")
-		sentiment_analyzers[model_type] = SentimentAnalyzer(model_type)
-		print(f"✅ Sentiment model {model_type} loaded successfully")
+		sentiment_models.load(model_type)
 		return {"ok": True, "model": model_type, "message": "Model loaded successfully"}
 	except Exception as e:
-		print(f"❌ Error loading sentiment model {model_type}: {e}")
 		raise HTTPException(status_code=500, detail=f"Failed to load model {model_type}: {e}")
 
 
 @app.get("/admin/sentiment_models_status")
 def get_sentiment_models_status():
-	global sentiment_analyzers
-	return {
-		"loaded_models": list(sentiment_analyzers.keys()),
-		"available_models": ["roberta", "distilbert"]
-	}
+	return sentiment_models.status()
+
+
+@app.get("/admin/batch_tuning")
+def get_batch_tuning():
+	return batch_tuner.snapshot()
+
+
+@app.get("/admin/summarizer_health")
+def get_summarizer_health():
+	"""Shared summarizer instances and their health checks, plus recent batch p95 latency, error rate and failover state."""
+	return {"summarizers": summarizers.status(), "batches": backend_health.snapshot()}
+
+
+@app.get("/admin/llm_scheduler")
+def get_llm_scheduler():
+	"""Per-backend summarization queues: in-flight requests, waiting batches per analysis and rate budgets."""
+	return get_engine().scheduler_stats()
+
+
+@app.post("/sentiment", response_model=SentimentResponse)
+async def score_sentiment(req: SentimentRequest):
+	"""Score one or a few comments online, micro-batched with concurrent requests."""
+	texts = req.texts if req.texts is not None else ([req.text] if req.text is not None else [])
+	if not texts:
+		raise HTTPException(status_code=400, detail="Provide 'text' or a non-empty 'texts' list")
+	if req.model not in ["roberta", "distilbert", "cascade"]:
+		raise HTTPException(status_code=400, detail="Invalid model type. Must be 'roberta', 'distilbert' or 'cascade'")
+	try:
+		results = await sentiment_batcher.predict(req.model, texts)
+	except Exception as e:
+		raise HTTPException(status_code=500, detail=f"Sentiment scoring failed: {e}")
+	return {"model": req.model, "results": [{"label": label, "score": score} for label, score in results]}
+
+
+@app.get("/sentiment/stats")
+def get_sentiment_stats():
+	return sentiment_batcher.stats()
 
 
 @app.post("/analyses/upload")
@@ -196,84 +242,214 @@ async def upload_analysis(background_tasks: BackgroundTasks, files: List[UploadF
 		(analysis_id, name, created_at, AnalysisStatus.uploaded.value, 0, sentiment_model),
 	)
 
-	# Parse files into comments
+	# Persist the raw files; parsing and sentiment run in the background pipeline
+	upload_dir = Path(DATA_DIR) / "uploads" / analysis_id
+	uploads = []
 	try:
-		parsed = await parse_files_to_comments(files)
+		for i, f in enumerate(files):
+			original_name = f.filename or "uploaded"
+			dest = upload_dir / f"{i:03d}_{Path(original_name).name}"
+			await run_in_threadpool(save_upload, f, dest)
+			uploads.append({"name": original_name, "path": str(dest)})
 	except Exception as e:
+		shutil.rmtree(upload_dir, ignore_errors=True)
 		execute("UPDATE analyses SET status=? WHERE id=?", (AnalysisStatus.failed.value, analysis_id))
-		raise HTTPException(status_code=400, detail=f"Failed to parse files: {e}")
+		raise HTTPException(status_code=500, detail=f"Failed to store uploaded files: {e}")
+
+	update_analysis_meta(analysis_id, {"uploads": uploads, "requested_summary_model": model_type})
+	background_tasks.add_task(start_ingestion_task, analysis_id)
+
+	analysis_row = fetchone("SELECT * FROM analyses WHERE id=?", (analysis_id,))
+	return JSONResponse({"analysis": row_to_analysis_out(analysis_row)}, status_code=202)
+
+
+def start_ingestion_task(analysis_id: str) -> None:
+	"""Background pipeline: parse stored uploads into comments, then score sentiment chunk by chunk.
+
+	Safe to call again after a crash: parsing restarts from the stored files if it
+	had not finished, and sentiment resumes from the first unscored comment.
+	"""
+	analysis = fetchone("SELECT sentiment_model, meta FROM analyses WHERE id=?", (analysis_id,))
+	if not analysis:
+		return
+	try:
+		meta = json.loads(analysis["meta"]) if analysis["meta"] else {}
+	except Exception:
+		meta = {}
+	uploads = meta.get("uploads") or []
+	model_type = meta.get("requested_summary_model") or "gemini"
+	sentiment_model = analysis["sentiment_model"] or "roberta"
+	upload_dir = Path(DATA_DIR) / "uploads" / analysis_id
+	execute("UPDATE analyses SET status=? WHERE id=?", (AnalysisStatus.processing.value, analysis_id))
+
+	if not meta.get("ingest_complete"):
+		try:
+			# Rows left by an interrupted parse are discarded; the stored files are parsed again
+			execute("DELETE FROM comments WHERE analysis_id=?", (analysis_id,))
+			total = parse_into_comments(analysis_id, iter_saved_uploads(uploads), model_type)
+			if not total:
+				raise ValueError("No valid comments found")
+		except Exception as e:
+			detail = e.detail if isinstance(e, HTTPException) else str(e)
+			print(f"❌ APP ERROR: Ingestion failed for analysis {analysis_id}: {detail}")
+			execute("DELETE FROM comments WHERE analysis_id=?", (analysis_id,))
+			shutil.rmtree(upload_dir, ignore_errors=True)
+			update_analysis_meta(analysis_id, {"ingest_error": detail}, remove=("uploads",))
+			execute("UPDATE analyses SET status=? WHERE id=?", (AnalysisStatus.failed.value, analysis_id))
+			return
+		duplicates = store_duplicate_counts(analysis_id)
+		update_analysis_meta(analysis_id, {"ingest_complete": True, "duplicates_collapsed": duplicates, "sentiment_progress": 0}, remove=("uploads",))
+		shutil.rmtree(upload_dir, ignore_errors=True)
 
-	if not parsed:
+	try:
+		with sentiment_models.use(sentiment_model) as analyzer:
+			run_sentiment_stage(analysis_id, analyzer)
+	except Exception as e:
+		# Scored chunks are kept; the analysis can be resumed from the first unscored comment
+		print(f"❌ APP ERROR: Sentiment failed for analysis {analysis_id}: {e}")
+		update_analysis_meta(analysis_id, {"ingest_error": str(e)})
 		execute("UPDATE analyses SET status=? WHERE id=?", (AnalysisStatus.failed.value, analysis_id))
-		raise HTTPException(status_code=400, detail="No valid comments found")
+		return
+
+	# Cache counts
+	counts = sentiment_counts_for(analysis_id)
+	execute("UPDATE analyses SET sentiment_counts=?, status=? WHERE id=?", (json.dumps(counts), AnalysisStatus.summarizing.value, analysis_id))
+
+	# Start summarization (if available) - wordclouds are generated on-demand
+	start_summarization_task(analysis_id)
+
 
+def parse_into_comments(analysis_id: str, files: Iterable[Tuple[str, BinaryIO]], model_type: str) -> int:
+	"""Stream comments from the uploaded files into the DB in fixed-size batches."""
+	total = 0
 	# Use UTC with 'Z' for comment timestamps as well
 	now = datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
-	comment_rows = []
-	for item in parsed:
-		comment_id = str(uuid.uuid4())
-		original = item["text"].strip()
-		cleaned = clean_text(original)
-		comment_rows.append(
-			(
-				comment_id,
-				analysis_id,
-				original,
-				cleaned,
-				None,
-				None,
-				None,
-				SummaryStatus.pending.value,
-				model_type,  # Store the model type
-				now,
-				item.get("file")
+	for batch in iter_batches(iter_files_to_comments(files), INGEST_BATCH_SIZE):
+		comment_rows = []
+		for item in batch:
+			original = item["text"].strip()
+			comment_rows.append(
+				(
+					str(uuid.uuid4()),
+					analysis_id,
+					original,
+					clean_text(original),
+					None,
+					None,
+					None,
+					SummaryStatus.pending.value,
+					model_type,  # Store the model type
+					now,
+					item.get("file"),
+					item["text_hash"],
+				)
 			)
+		executemany(
+			"""
+			INSERT INTO comments (
+				id, analysis_id, original_text, cleaned_text, sentiment_label, sentiment_score, summary, summary_status, summary_model, created_at, external_file, text_hash
+			) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+			""",
+			comment_rows,
+		)
+		total += len(comment_rows)
+		execute("UPDATE analyses SET total_comments=? WHERE id=?", (total, analysis_id))
+		print(f"🔍 APP DEBUG: Parsed {total} comments for analysis {analysis_id}")
+	return total
+
+
+def iter_unscored_comments(analysis_id: str) -> Iterator[Tuple[Tuple[str, Optional[str]], str]]:
+	"""Yield ((id, text_hash), cleaned_text) for comments without sentiment, paging by rowid."""
+	last_rowid = 0
+	while True:
+		rows = fetchall(
+			"SELECT rowid AS rid, id, text_hash, cleaned_text FROM comments WHERE analysis_id=? AND rowid>? AND sentiment_label IS NULL ORDER BY rowid LIMIT ?",
+			(analysis_id, last_rowid, SENTIMENT_CHUNK_SIZE),
 		)
+		if not rows:
+			return
+		for r in rows:
+			yield (r["id"], r["text_hash"]), r["cleaned_text"]
+		last_rowid = rows[-1]["rid"]
+
+
+def run_sentiment_stage(analysis_id: str, analyzer: SentimentAnalyzer) -> None:
+	"""Score unscored comments chunk by chunk, persisting each chunk and the progress before the next."""
+	total = fetchone("SELECT COUNT(*) AS c FROM comments WHERE analysis_id=?", (analysis_id,))["c"]
+	scored = fetchone("SELECT COUNT(*) AS c FROM comments WHERE analysis_id=? AND sentiment_label IS NOT NULL", (analysis_id,))["c"]
+	meta = update_analysis_meta(analysis_id, {})
+	prev = meta.get("sentiment_cache") or {}
+	prev_cascade = meta.get("sentiment_cascade") or {}
+	stats: Dict[str, int] = {
+		"cache_hits": prev.get("hits", 0),
+		"cache_misses": prev.get("misses", 0),
+		"cascade_total": prev_cascade.get("total", 0),
+		"cascade_escalated": prev_cascade.get("escalated", 0),
+	}
+	if scored:
+		print(f"🔍 APP DEBUG: Resuming sentiment for analysis {analysis_id} at {scored}/{total}")
+	for chunk in analyzer.predict_iter(iter_unscored_comments(analysis_id), SENTIMENT_CHUNK_SIZE, stats):
+		# Matching on text_hash also labels later duplicates of each text, which are then skipped
+		scored += executemany(
+			"UPDATE comments SET sentiment_label=?, sentiment_score=?, sentiment_probs=? WHERE analysis_id=? AND (id=? OR text_hash=?) AND sentiment_label IS NULL",
+			[(label, float(score), probs, analysis_id, cid, text_hash) for (cid, text_hash), label, score, probs in chunk],
+		)
+		meta_updates: Dict[str, Any] = {
+			"sentiment_progress": int(scored * 100 / total) if total else 100,
+			"sentiment_cache": {"hits": stats["cache_hits"], "misses": stats["cache_misses"]},
+		}
+		if stats["cascade_total"]:
+			meta_updates["sentiment_cascade"] = {
+				"total": stats["cascade_total"],
+				"escalated": stats["cascade_escalated"],
+				"escalated_fraction": round(stats["cascade_escalated"] / stats["cascade_total"], 4),
+			}
+		update_analysis_meta(analysis_id, meta_updates)
+		print(f"🔍 APP DEBUG: Sentiment progress for analysis {analysis_id}: {scored}/{total}")
+	update_analysis_meta(analysis_id, {"sentiment_progress": 100})
 
-	executemany(
+
+def store_duplicate_counts(analysis_id: str) -> int:
+	"""Store each comment's duplicate group size; returns how many comments are copies of another."""
+	execute(
 		"""
-		INSERT INTO comments (
-			id, analysis_id, original_text, cleaned_text, sentiment_label, sentiment_score, summary, summary_status, summary_model, created_at, external_file
-		) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+		UPDATE comments SET duplicate_count=(
+			SELECT COUNT(*) FROM comments c WHERE c.analysis_id=comments.analysis_id AND c.text_hash=comments.text_hash
+		) WHERE analysis_id=? AND text_hash IS NOT NULL
 		""",
-		comment_rows,
+		(analysis_id,),
 	)
-	execute("UPDATE analyses SET total_comments=?, status=? WHERE id=?", (len(comment_rows), AnalysisStatus.processing.value, analysis_id))
+	row = fetchone("SELECT COUNT(*) - COUNT(DISTINCT text_hash) AS c FROM comments WHERE analysis_id=? AND text_hash IS NOT NULL", (analysis_id,))
+	return row["c"] if row else 0
 
-	# Run fast local sentiment now with selected model
-	global sentiment_analyzers
-	if sentiment_model not in sentiment_analyzers:
-		# Load the model if not already loaded
+
+def resume_interrupted_analyses() -> None:
+	"""Restart pipeline stages for analyses left unfinished by a previous process."""
+	rows = fetchall(
+		"SELECT id, status FROM analyses WHERE status IN (?, ?, ?) ORDER BY created_at",
+		(AnalysisStatus.uploaded.value, AnalysisStatus.processing.value, AnalysisStatus.summarizing.value),
+	)
+	for r in rows:
+		print(f"🔄 Resuming analysis {r['id']} (status: {r['status']})")
 		try:
-			print(f"🔄 Loading sentiment model {sentiment_model} for analysis...")
-			sentiment_analyzers[sentiment_model] = SentimentAnalyzer(sentiment_model)
-			print(f"✅ Sentiment model {sentiment_model} loaded successfully")
+			if r["status"] == AnalysisStatus.summarizing.value:
+				start_summarization_task(r["id"])
+			else:
+				start_ingestion_task(r["id"])
 		except Exception as e:
-			raise HTTPException(status_code=500, detail=f"Failed to load sentiment model '{sentiment_model}': {e}")
-	
-	current_sentiment_analyzer = sentiment_analyzers[sentiment_model]
-	labels, scores = current_sentiment_analyzer.predict([row[2] for row in comment_rows])
-	update_rows = []
-	for i, row in enumerate(comment_rows):
-		update_rows.append((labels[i], float(scores[i]), row[0]))
-	executemany("UPDATE comments SET sentiment_label=?, sentiment_score=? WHERE id=?", update_rows)
+			print(f"❌ APP ERROR: Failed to resume analysis {r['id']}: {e}")
 
-	# Cache counts
-	counts = compute_sentiment_counts(labels)
-	execute("UPDATE analyses SET sentiment_counts=?, status=? WHERE id=?", (json.dumps(counts), AnalysisStatus.summarizing.value, analysis_id))
 
-	# Start summarization (if available) - wordclouds are generated on-demand
-	background_tasks.add_task(start_summarization_task, analysis_id)
-
-	analysis_row = fetchone("SELECT * FROM analyses WHERE id=?", (analysis_id,))
-	return JSONResponse(
-		{
-			"analysis": row_to_analysis_out(analysis_row),
-			"initial_sentiment_counts": counts,
-		}
+def sentiment_counts_for(analysis_id: str) -> Dict[str, int]:
+	counts = {"positive": 0, "neutral": 0, "negative": 0}
+	rows = fetchall(
+		"SELECT sentiment_label, COUNT(*) AS c FROM comments WHERE analysis_id=? GROUP BY sentiment_label",
+		(analysis_id,),
 	)
-
-
+	for r in rows:
+		if r["sentiment_label"] in counts:
+			counts[r["sentiment_label"]] = r["c"]
+	return counts
 
 
 @app.get("/analyses")
@@ -854,6 +1030,34 @@ def export_pdf(analysis_id: str):
 	return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
 
 
+@app.post("/analyses/{analysis_id}/relabel")
+def relabel_analysis(analysis_id: str, req: RelabelRequest):
+	"""Recompute sentiment labels and counts from stored class probabilities, without loading a model."""
+	analysis = fetchone("SELECT status FROM analyses WHERE id=?", (analysis_id,))
+	if not analysis:
+		raise HTTPException(status_code=404, detail="Analysis not found")
+	if analysis["status"] in (AnalysisStatus.uploaded.value, AnalysisStatus.processing.value):
+		raise HTTPException(status_code=409, detail="Sentiment analysis is still running")
+	rows = fetchall("SELECT id, sentiment_label, sentiment_probs FROM comments WHERE analysis_id=? AND sentiment_probs IS NOT NULL", (analysis_id,))
+	labels = relabel_probs(unpack_probs([r["sentiment_probs"] for r in rows]), req.neutral_margin, req.min_confidence, req.binary)
+	changed = [(label, r["id"]) for r, label in zip(rows, labels) if label != r["sentiment_label"]]
+	executemany("UPDATE comments SET sentiment_label=? WHERE id=?", changed)
+	counts = sentiment_counts_for(analysis_id)
+	total = fetchone("SELECT COUNT(*) AS c FROM comments WHERE analysis_id=?", (analysis_id,))["c"]
+	relabel = {
+		"neutral_margin": req.neutral_margin,
+		"min_confidence": req.min_confidence,
+		"binary": req.binary,
+		"changed": len(changed),
+		# Comments scored before probabilities were stored keep their label
+		"skipped": total - len(rows),
+	}
+	execute("UPDATE analyses SET sentiment_counts=? WHERE id=?", (json.dumps(counts), analysis_id))
+	update_analysis_meta(analysis_id, {"sentiment_relabel": relabel})
+	print(f"🔍 APP DEBUG: Relabeled analysis {analysis_id}: {len(changed)} changed, {relabel['skipped']} without probabilities")
+	return {"sentiment_counts": counts, **relabel}
+
+
 @app.post("/analyses/{analysis_id}/summarize")
 def trigger_summarize(background_tasks: BackgroundTasks, analysis_id: str):
 	analysis = fetchone("SELECT * FROM analyses WHERE id= ?", (analysis_id,))
@@ -904,25 +1108,45 @@ def retry_failed_summaries(background_tasks: BackgroundTasks, analysis_id: str):
 
 
 def start_summarization_task(analysis_id: str) -> None:
-	# Get the model type from the first comment
+	# Get the model type requested at upload; older analyses only have it on their comments
 	first_comment = fetchone("SELECT summary_model FROM comments WHERE analysis_id=? LIMIT 1", (analysis_id,))
 	if not first_comment or not first_comment["summary_model"]:
 		mark_summaries_unavailable(analysis_id)
 		return
 	
-	model_type = first_comment["summary_model"]
+	model_type = update_analysis_meta(analysis_id, {}).get("requested_summary_model") or first_comment["summary_model"]
 	
 	# Create the appropriate summarizer
 	try:
 		if model_type == "gemini":
-			if not summarizer or not isinstance(summarizer, GeminiSummarizer):
-				raise RuntimeError("Gemini summarizer not available")
-			current_summarizer = summarizer
+			current_summarizer = summarizers.get("gemini")
 			print(f"🔍 APP DEBUG: Using Gemini summarizer")
 		elif model_type == "ollama":
-			print(f"🔍 APP DEBUG: Creating Ollama summarizer with model gemma3:1b")
-			current_summarizer = OllamaSummarizer("gemma3:1b")
-			print(f"🔍 APP DEBUG: Ollama summarizer created successfully")
+			current_summarizer = summarizers.get("ollama")
+			print(f"🔍 APP DEBUG: Using shared Ollama summarizer ({current_summarizer.model_name})")
+		elif model_type == "hybrid":
+			try:
+				primary = summarizers.get("gemini")
+			except RuntimeError:
+				primary = None
+			try:
+				secondary = summarizers.get("ollama")
+			except RuntimeError:
+				secondary = None
+			if primary is not None and secondary is not None:
+				current_summarizer = HedgedSummarizer(primary, secondary)
+				print(f"🔍 APP DEBUG: Using Gemini with hedging/failover to Ollama")
+			elif primary is not None:
+				current_summarizer = primary
+				print(f"⚠️ APP DEBUG: Ollama summarizer not available, hybrid mode uses Gemini only")
+			elif secondary is not None:
+				current_summarizer = secondary
+				print(f"⚠️ APP DEBUG: Gemini summarizer not available, hybrid mode uses Ollama only")
+			else:
+				raise RuntimeError(f"Neither summarizer is available for hybrid mode (Gemini: {summarizers.error('gemini')}; Ollama: {summarizers.error('ollama')})")
+		elif model_type == "local":
+			current_summarizer = summarizers.get("local")
+			print(f"🔍 APP DEBUG: Using local extractive summarizer")
 		else:
 			raise RuntimeError(f"Unknown model type: {model_type}")
 	except Exception as e:
@@ -945,20 +1169,78 @@ def start_summarization_task(analysis_id: str) -> None:
 	# Get total count for progress tracking
 	total_comments = fetchone("SELECT COUNT(*) AS c FROM comments WHERE analysis_id=?", (analysis_id,))["c"]
 	
-	rows = fetchall(
-		"SELECT id, original_text FROM comments WHERE analysis_id=? AND (summary IS NULL OR summary_status=?) ORDER BY created_at",
+	all_rows = fetchall(
+		"SELECT id, original_text, cleaned_text, text_hash FROM comments WHERE analysis_id=? AND (summary IS NULL OR summary_status=?) ORDER BY created_at",
 		(analysis_id, SummaryStatus.pending.value),
 	)
-	items = [(r["id"], r["original_text"]) for r in rows]
-	items_to_process = len(items)
+	items_to_process = len(all_rows)
 	print(f"🔍 APP DEBUG: Found {items_to_process} items to summarize for analysis {analysis_id} (total: {total_comments})")
-	if not items:
-		print("🔍 APP DEBUG: No items to summarize, returning")
+	if not all_rows:
+		print("🔍 APP DEBUG: No items to summarize, marking analysis done")
+		update_analysis_meta(analysis_id, {"summarization_progress": 100})
+		execute("UPDATE analyses SET status=? WHERE id=?", (AnalysisStatus.done.value, analysis_id))
 		return
+
+	# Collapse identical texts: only the first comment of each group is summarized, the rest share its result
+	groups: Dict[str, List[str]] = {}
+	canonical_by_text: Dict[str, str] = {}
+	rows = []
+	for r in all_rows:
+		text_key = r["text_hash"] or r["cleaned_text"] or r["original_text"]
+		canonical = canonical_by_text.get(text_key)
+		if canonical is None:
+			canonical_by_text[text_key] = r["id"]
+			groups[r["id"]] = [r["id"]]
+			rows.append(r)
+		else:
+			groups[canonical].append(r["id"])
+	print(f"🔍 APP DEBUG: {len(rows)} distinct texts among {items_to_process} pending comments")
+
+	# Short comments are summarized locally on the CPU; only longer ones go to the LLM
+	completed_count = 0
+	if current_summarizer.backend != "local" and SUM_LOCAL_MAX_WORDS > 0:
+		t0 = time.perf_counter()
+		local_summarizer = summarizers.get("local")
+		local_results, llm_items = route_local(local_summarizer, [(r["id"], r["original_text"]) for r in rows])
+		if local_results:
+			local_results = {member: out for cid, out in local_results.items() for member in groups[cid]}
+			completed_count += store_summary_results(local_results, {}, local_summarizer)
+			llm_ids = {cid for cid, _ in llm_items}
+			rows = [r for r in rows if r["id"] in llm_ids]
+		routing = {
+			"local": completed_count,
+			"llm": items_to_process - completed_count,
+			"max_words": SUM_LOCAL_MAX_WORDS,
+			"local_seconds": round(time.perf_counter() - t0, 3),
+		}
+		print(f"🔍 APP DEBUG: Routed {routing['local']} short comments to the local summarizer, {routing['llm']} to {current_summarizer.backend}")
+		update_analysis_meta(analysis_id, {
+			"summary_routing": routing,
+			"summarization_progress": int((completed_count / items_to_process) * 100),
+		})
+
+	# Fill summaries already produced for identical text by the same backend, model and prompt rules
+	cache_keys: Dict[str, str] = {}
+	if SUMMARY_CACHE_ENABLED:
+		for r in rows:
+			cache_keys[r["id"]] = summary_cache_key(r["cleaned_text"] or clean_text(r["original_text"]), current_summarizer.backend, current_summarizer.model_name, PROMPT_RULES_VERSION, SUM_MAX_WORDS)
+		cached = get_cached_summaries(list(cache_keys.values()))
+		hit_updates = [(cached[cache_keys[r["id"]]], SummaryStatus.ok.value, member) for r in rows if cache_keys[r["id"]] in cached for member in groups[r["id"]]]
+		if hit_updates:
+			executemany("UPDATE comments SET summary=?, summary_status=? WHERE id=?", hit_updates)
+			completed_count += len(hit_updates)
+		items = [(r["id"], r["original_text"]) for r in rows if cache_keys[r["id"]] not in cached]
+		print(f"🔍 APP DEBUG: Summary cache hits: {len(hit_updates)}, misses: {len(items)}")
+		update_analysis_meta(analysis_id, {
+			"summary_cache": {"hits": len(hit_updates), "misses": items_to_process - completed_count},
+			"summarization_progress": int((completed_count / items_to_process) * 100),
+		})
+	else:
+		items = [(r["id"], r["original_text"]) for r in rows]
+
 	# Stream batches to persist progressive results so UI updates incrementally
 	try:
 		print(f"🔍 APP DEBUG: Starting summarization with {current_summarizer.__class__.__name__}")
-		completed_count = 0
 		# Persist chosen summary model and resolved model name for UI display
 		try:
 			resolved_model_name = None
@@ -971,7 +1253,7 @@ def start_summarization_task(analysis_id: str) -> None:
 				if not resolved_model_name:
 					# Fallback to env if SDK object doesn't expose the name
 					resolved_model_name = os.getenv("GEMINI_MODEL")
-			elif isinstance(current_summarizer, OllamaSummarizer):
+			elif isinstance(current_summarizer, (OllamaSummarizer, HedgedSummarizer, ExtractiveSummarizer)):
 				resolved_model_name = getattr(current_summarizer, "model_name", None)
 			meta = fetchone("SELECT meta FROM analyses WHERE id=?", (analysis_id,))
 			try:
@@ -985,102 +1267,37 @@ def start_summarization_task(analysis_id: str) -> None:
 		except Exception:
 			pass
 		
+		attempt_stats: Dict[str, int] = {}
 		if hasattr(current_summarizer, "summarize_in_batches_stream"):
 			print("🔍 APP DEBUG: Using stream method")
-			for batch_result in current_summarizer.summarize_in_batches_stream(items):
+			# Every batch result is persisted as it arrives: successes right away, failures once the summarizer's retries are exhausted
+			for batch_result in current_summarizer.summarize_in_batches_stream(items, attempt_stats, job=analysis_id):
 				print(f"🔍 APP DEBUG: Received batch result: {batch_result}")
-				
-				# Calculate batch success rate
-				batch_success_count = sum(1 for out in batch_result.values() if out.get("ok"))
-				batch_total_count = len(batch_result)
-				batch_success_rate = batch_success_count / batch_total_count if batch_total_count > 0 else 0
-				
-				print(f"🔍 APP DEBUG: Batch success rate: {batch_success_count}/{batch_total_count} ({batch_success_rate:.1%})")
-				
-				# Only update database if batch has >= 90% success rate
-				if batch_success_rate >= 0.9:
-					print(f"✅ APP DEBUG: Batch success rate {batch_success_rate:.1%} >= 90%, updating database")
-					
-					ok_updates = []
-					error_updates = []
-					for cid, out in batch_result.items():
-						if out.get("ok"):
-							ok_updates.append((out["summary"], SummaryStatus.ok.value, cid))
-							print(f"✅ APP DEBUG: Adding summary for {cid}: '{out['summary']}'")
-						else:
-							error_updates.append((SummaryStatus.error.value, cid))
-							print(f"❌ APP DEBUG: Marking as failed: {cid} - {out.get('error', 'Unknown error')}")
-					
-					if ok_updates:
-						print(f"🔍 APP DEBUG: Updating {len(ok_updates)} comments with summaries")
-						executemany("UPDATE comments SET summary=?, summary_status=? WHERE id=?", ok_updates)
-						completed_count += len(ok_updates)
-					
-					if error_updates:
-						print(f"🔍 APP DEBUG: Marking {len(error_updates)} comments as failed")
-						executemany("UPDATE comments SET summary_status=? WHERE id=?", error_updates)
-						completed_count += len(error_updates)
-					
-					# Update progress in analysis meta - use items_to_process for accurate progress
-					progress_percent = int((completed_count / items_to_process) * 100) if items_to_process > 0 else 0
-					meta = fetchone("SELECT meta FROM analyses WHERE id=?", (analysis_id,))
-					try:
-						cur_meta = json.loads(meta["meta"]) if meta and meta["meta"] else {}
-					except Exception:
-						cur_meta = {}
-					cur_meta["summarization_progress"] = progress_percent
-					execute("UPDATE analyses SET meta=? WHERE id=?", (json.dumps(cur_meta), analysis_id))
-					print(f"🔍 APP DEBUG: Progress: {completed_count}/{items_to_process} ({progress_percent}%)")
-				else:
-					print(f"⚠️ APP DEBUG: Batch success rate {batch_success_rate:.1%} < 90%, not updating database - will retry")
+				# Fan each canonical result out to every duplicate of that text
+				batch_result = {member: out for cid, out in batch_result.items() for member in groups.get(cid, [cid])}
+				completed_count += store_summary_results(batch_result, cache_keys, current_summarizer)
+				progress_percent = int((completed_count / items_to_process) * 100) if items_to_process > 0 else 0
+				update_analysis_meta(analysis_id, {"summarization_progress": progress_percent})
+				print(f"🔍 APP DEBUG: Progress: {completed_count}/{items_to_process} ({progress_percent}%)")
 		else:
 			print("🔍 APP DEBUG: Using non-stream method")
 			results = current_summarizer.summarize_in_batches(items)
 			print(f"🔍 APP DEBUG: Received results: {results}")
-			
-			# Calculate overall success rate
-			success_count = sum(1 for out in results.values() if out.get("ok"))
-			total_count = len(results)
-			overall_success_rate = success_count / total_count if total_count > 0 else 0
-			
-			print(f"🔍 APP DEBUG: Overall success rate: {success_count}/{total_count} ({overall_success_rate:.1%})")
-			
-			# Only update database if overall success rate >= 90%
-			if overall_success_rate >= 0.9:
-				print(f"✅ APP DEBUG: Overall success rate {overall_success_rate:.1%} >= 90%, updating database")
-				
-				ok_updates = []
-				error_updates = []
-				for cid, out in results.items():
-					if out.get("ok"):
-						ok_updates.append((out["summary"], SummaryStatus.ok.value, cid))
-						print(f"✅ APP DEBUG: Adding summary for {cid}: '{out['summary']}'")
-					else:
-						error_updates.append((SummaryStatus.error.value, cid))
-						print(f"❌ APP DEBUG: Marking as failed: {cid} - {out.get('error', 'Unknown error')}")
-				
-				if ok_updates:
-					print(f"🔍 APP DEBUG: Updating {len(ok_updates)} comments with summaries")
-					executemany("UPDATE comments SET summary=?, summary_status=? WHERE id=?", ok_updates)
-					completed_count += len(ok_updates)
-				
-				if error_updates:
-					print(f"🔍 APP DEBUG: Marking {len(error_updates)} comments as failed")
-					executemany("UPDATE comments SET summary_status=? WHERE id=?", error_updates)
-					completed_count += len(error_updates)
-				
-				# Update progress in analysis meta - use items_to_process for accurate progress
-				progress_percent = int((completed_count / items_to_process) * 100) if items_to_process > 0 else 0
-				meta = fetchone("SELECT meta FROM analyses WHERE id=?", (analysis_id,))
-				try:
-					cur_meta = json.loads(meta["meta"]) if meta and meta["meta"] else {}
-				except Exception:
-					cur_meta = {}
-				cur_meta["summarization_progress"] = progress_percent
-				execute("UPDATE analyses SET meta=? WHERE id=?", (json.dumps(cur_meta), analysis_id))
-				print(f"🔍 APP DEBUG: Progress: {completed_count}/{items_to_process} ({progress_percent}%)")
-			else:
-				print(f"⚠️ APP DEBUG: Overall success rate {overall_success_rate:.1%} < 90%, not updating database - will retry")
+			results = {member: out for cid, out in results.items() for member in groups.get(cid, [cid])}
+			completed_count += store_summary_results(results, cache_keys, current_summarizer)
+			progress_percent = int((completed_count / items_to_process) * 100) if items_to_process > 0 else 0
+			update_analysis_meta(analysis_id, {"summarization_progress": progress_percent})
+			print(f"🔍 APP DEBUG: Progress: {completed_count}/{items_to_process} ({progress_percent}%)")
+		if attempt_stats and items:
+			update_analysis_meta(analysis_id, {"summary_attempts": {
+				"items": len(items),
+				"items_sent": attempt_stats.get("items_sent", 0),
+				"retried": attempt_stats.get("retried", 0),
+				"retry_rounds": attempt_stats.get("retry_rounds", 0),
+				"requests_per_item": round(attempt_stats.get("items_sent", 0) / len(items), 3),
+			}})
+		if isinstance(current_summarizer, HedgedSummarizer):
+			update_analysis_meta(analysis_id, {"summary_hedging": current_summarizer.stats})
 	except Exception as e:
 		print(f"❌ APP ERROR: Exception during summarization: {e}")
 		import traceback
@@ -1126,6 +1343,46 @@ def start_summarization_task(analysis_id: str) -> None:
 	print(f"🔍 APP DEBUG: Summarization completed for analysis {analysis_id}")
 
 
+def store_summary_results(results: Dict[str, Dict[str, Any]], cache_keys: Dict[str, str], current_summarizer) -> int:
+	"""Persist summarizer results: ok summaries are stored (and cached), the rest marked failed. Returns comments updated."""
+	ok_updates = []
+	error_updates = []
+	model_updates = []
+	for cid, out in results.items():
+		if out.get("ok"):
+			ok_updates.append((out["summary"], SummaryStatus.ok.value, cid))
+			if out.get("backend"):
+				# Composite summarizers report which backend wrote each summary
+				model_updates.append((out["backend"], cid))
+		else:
+			error_updates.append((SummaryStatus.error.value, cid))
+			print(f"❌ APP DEBUG: Marking as failed: {cid} - {out.get('error', 'Unknown error')}")
+	if ok_updates:
+		print(f"🔍 APP DEBUG: Updating {len(ok_updates)} comments with summaries")
+		executemany("UPDATE comments SET summary=?, summary_status=? WHERE id=?", ok_updates)
+		if model_updates:
+			executemany("UPDATE comments SET summary_model=? WHERE id=?", model_updates)
+		if cache_keys:
+			put_cached_summaries(current_summarizer.backend, current_summarizer.model_name, [(cache_keys[cid], summary) for summary, _, cid in ok_updates if cid in cache_keys])
+	if error_updates:
+		print(f"🔍 APP DEBUG: Marking {len(error_updates)} comments as failed")
+		executemany("UPDATE comments SET summary_status=? WHERE id=?", error_updates)
+	return len(ok_updates) + len(error_updates)
+
+
+def update_analysis_meta(analysis_id: str, updates: Dict[str, Any], remove: Tuple[str, ...] = ()) -> Dict[str, Any]:
+	meta = fetchone("SELECT meta FROM analyses WHERE id=?", (analysis_id,))
+	try:
+		cur_meta = json.loads(meta["meta"]) if meta and meta["meta"] else {}
+	except Exception:
+		cur_meta = {}
+	cur_meta.update(updates)
+	for key in remove:
+		cur_meta.pop(key, None)
+	execute("UPDATE analyses SET meta=? WHERE id=?", (json.dumps(cur_meta), analysis_id))
+	return cur_meta
+
+
 def mark_summaries_unavailable(analysis_id: str) -> None:
 	executemany(
 		"UPDATE comments SET summary_status=? WHERE analysis_id=? AND summary_status=?",
@@ -1180,6 +1437,7 @@ def row_to_comment_out(r) -> Dict[str, Any]:
 		"summary_model": r["summary_model"] if "summary_model" in r.keys() else None,
 		"created_at": r["created_at"],
 		"external_file": r["external_file"],
+		"duplicate_count": r["duplicate_count"] if "duplicate_count" in r.keys() else None,
 	}
 
 @app.get("/analyses/{analysis_id}/wordcloud")
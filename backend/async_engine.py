@@ -0,0 +1,339 @@
+import os
+import queue
+import asyncio
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, Iterator, Optional, Set, Tuple, TypeVar
+from collections import deque
+
+import httpx
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_DEFAULT_CONCURRENCY = int(os.getenv("SUM_CONCURRENCY", "3"))
+# Concurrent in-flight batches per summarization backend (falls back to SUM_CONCURRENCY)
+BACKEND_CONCURRENCY = {
+	"gemini": int(os.getenv("GEMINI_CONCURRENCY", str(_DEFAULT_CONCURRENCY))),
+	"ollama": int(os.getenv("OLLAMA_CONCURRENCY", str(_DEFAULT_CONCURRENCY))),
+}
+# Requests and (estimated) tokens per minute allowed per backend; 0 = unlimited
+BACKEND_RPM = {
+	"gemini": float(os.getenv("GEMINI_RPM", "0")),
+	"ollama": float(os.getenv("OLLAMA_RPM", "0")),
+}
+BACKEND_TPM = {
+	"gemini": float(os.getenv("GEMINI_TPM", "0")),
+	"ollama": float(os.getenv("OLLAMA_TPM", "0")),
+}
+# Rate-limited (429) requests are retried this many times after pausing the whole backend
+SUM_RATE_LIMIT_RETRIES = int(os.getenv("SUM_RATE_LIMIT_RETRIES", "3"))
+# Pause when the backend gives no Retry-After (doubles per attempt)
+SUM_RATE_LIMIT_BACKOFF_SECONDS = float(os.getenv("SUM_RATE_LIMIT_BACKOFF_SECONDS", "5"))
+# Pooled keep-alive connections shared by all HTTP summarizer requests
+SUM_HTTP_MAX_CONNECTIONS = int(os.getenv("SUM_HTTP_MAX_CONNECTIONS", "20"))
+SUM_HTTP_KEEPALIVE_SECONDS = float(os.getenv("SUM_HTTP_KEEPALIVE_SECONDS", "60"))
+
+
+class RateLimited(Exception):
+	"""Raised by a backend call that was rejected for rate limiting (e.g. HTTP 429)."""
+
+	def __init__(self, retry_after: Optional[float] = None, detail: str = "") -> None:
+		super().__init__(detail or "Rate limited")
+		self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+	"""Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+	if not value:
+		return None
+	try:
+		return max(0.0, float(value))
+	except ValueError:
+		pass
+	try:
+		return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+	except (TypeError, ValueError):
+		return None
+
+
+class TokenBucket:
+	"""Budget refilled continuously at ``per_minute`` units per minute, holding at most a minute's worth."""
+
+	def __init__(self, per_minute: float, now: float) -> None:
+		self.capacity = per_minute
+		self.level = per_minute
+		self.rate = per_minute / 60.0
+		self.updated = now
+
+	def _refill(self, now: float) -> None:
+		self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+		self.updated = now
+
+	def wait_time(self, amount: float, now: float) -> float:
+		self._refill(now)
+		amount = min(amount, self.capacity)
+		return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+	def take(self, amount: float, now: float) -> None:
+		self._refill(now)
+		self.level -= min(amount, self.capacity)
+
+
+class BackendScheduler:
+	"""Admission control for one summarization backend, shared by every analysis.
+
+	A request starts only when a concurrency slot is free, the requests/min and
+	tokens/min buckets allow it and no Retry-After pause is active. Waiting
+	requests are queued per job (analysis) and served round-robin, so a large
+	job cannot starve a small one. Lives on the engine loop; not thread-safe.
+	"""
+
+	def __init__(self, backend: str, loop: asyncio.AbstractEventLoop, concurrency: int, rpm: float, tpm: float) -> None:
+		self.backend = backend
+		self._loop = loop
+		self.concurrency = concurrency
+		now = loop.time()
+		self.requests = TokenBucket(rpm, now) if rpm > 0 else None
+		self.tokens = TokenBucket(tpm, now) if tpm > 0 else None
+		self.in_flight = 0
+		self.paused_until = 0.0
+		self.rate_limited = 0
+		self.started = 0
+		self._waiters: Dict[str, Deque[Tuple[float, "asyncio.Future"]]] = {}
+		self._timer: Optional[asyncio.TimerHandle] = None
+
+	async def acquire(self, job: str, tokens: float) -> None:
+		fut = self._loop.create_future()
+		self._waiters.setdefault(job, deque()).append((tokens, fut))
+		self._dispatch()
+		try:
+			await fut
+		except asyncio.CancelledError:
+			# Granted just before the waiter was cancelled: hand the slot back
+			if fut.done() and not fut.cancelled():
+				self.release()
+			raise
+
+	def release(self) -> None:
+		self.in_flight -= 1
+		self._dispatch()
+
+	def pause(self, seconds: float) -> None:
+		self.rate_limited += 1
+		self.paused_until = max(self.paused_until, self._loop.time() + seconds)
+
+	def _on_timer(self) -> None:
+		self._timer = None
+		self._dispatch()
+
+	def _dispatch(self) -> None:
+		now = self._loop.time()
+		while self._waiters and self.in_flight < self.concurrency:
+			job = next(iter(self._waiters))
+			waiting = self._waiters[job]
+			while waiting and waiting[0][1].done():
+				waiting.popleft()
+			if not waiting:
+				del self._waiters[job]
+				continue
+			tokens, fut = waiting[0]
+			wait = max(
+				self.paused_until - now,
+				self.requests.wait_time(1, now) if self.requests else 0.0,
+				self.tokens.wait_time(tokens, now) if self.tokens else 0.0,
+			)
+			if wait > 0:
+				if self._timer is None:
+					self._timer = self._loop.call_later(wait, self._on_timer)
+				return
+			waiting.popleft()
+			if self.requests:
+				self.requests.take(1, now)
+			if self.tokens:
+				self.tokens.take(tokens, now)
+			self.in_flight += 1
+			self.started += 1
+			# Rotate: this job goes to the back of the line
+			del self._waiters[job]
+			if waiting:
+				self._waiters[job] = waiting
+			fut.set_result(None)
+
+	def stats(self) -> Dict[str, Any]:
+		return {
+			"concurrency": self.concurrency,
+			"in_flight": self.in_flight,
+			"started": self.started,
+			"waiting": {job: sum(1 for _, f in q if not f.done()) for job, q in self._waiters.items()},
+			"rpm": self.requests.capacity if self.requests else None,
+			"tpm": self.tokens.capacity if self.tokens else None,
+			"rate_limited": self.rate_limited,
+			"paused_for_s": round(max(0.0, self.paused_until - self._loop.time()), 1),
+		}
+
+
+class _Emitted:
+	def __init__(self, value: Any) -> None:
+		self.value = value
+
+
+class AsyncBatchEngine:
+	"""Run summarization batches for every backend as coroutines on one background event loop.
+
+	Callers stay synchronous: ``map_stream`` schedules one coroutine per batch
+	and yields results as they complete. Every backend request goes through
+	``submit``, which queues it on that backend's process-wide
+	``BackendScheduler`` (concurrency, rate budgets, Retry-After pauses and
+	round-robin fairness across jobs). HTTP backends share one pooled,
+	keep-alive ``httpx.AsyncClient``.
+	"""
+
+	def __init__(self) -> None:
+		self._loop: Optional[asyncio.AbstractEventLoop] = None
+		self._thread: Optional[threading.Thread] = None
+		self._lock = threading.Lock()
+		# Schedulers of each engine loop, created on first use and dropped only once that loop has stopped
+		self._schedulers: Dict[asyncio.AbstractEventLoop, Dict[str, BackendScheduler]] = {}
+		self._http: Optional[httpx.AsyncClient] = None
+
+	def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+		with self._lock:
+			if self._loop is None or self._loop.is_closed():
+				self._loop = asyncio.new_event_loop()
+				self._thread = threading.Thread(target=self._loop.run_forever, name="summarize-engine", daemon=True)
+				self._thread.start()
+			return self._loop
+
+	def concurrency(self, backend: str) -> int:
+		return max(1, BACKEND_CONCURRENCY.get(backend, _DEFAULT_CONCURRENCY))
+
+	def _scheduler(self, backend: str) -> BackendScheduler:
+		loop = asyncio.get_running_loop()
+		schedulers = self._schedulers.setdefault(loop, {})
+		sched = schedulers.get(backend)
+		if sched is None:
+			sched = schedulers[backend] = BackendScheduler(
+				backend, loop, self.concurrency(backend), BACKEND_RPM.get(backend, 0.0), BACKEND_TPM.get(backend, 0.0)
+			)
+		return sched
+
+	async def submit(self, backend: str, job: str, tokens: float, call: Callable[[], Awaitable[T]]) -> T:
+		"""Run one backend request once the scheduler admits it, retrying after ``RateLimited``.
+
+		A rate-limited request pauses the whole backend for its Retry-After (or
+		an exponential backoff) before being queued again.
+		"""
+		sched = self._scheduler(backend)
+		attempt = 0
+		while True:
+			await sched.acquire(job, tokens)
+			try:
+				return await call()
+			except RateLimited as e:
+				if attempt >= SUM_RATE_LIMIT_RETRIES:
+					raise
+				delay = e.retry_after if e.retry_after is not None else SUM_RATE_LIMIT_BACKOFF_SECONDS * (2 ** attempt)
+				attempt += 1
+				print(f"⚠️ LLM SCHEDULER: {backend} rate limited, pausing {delay:.1f}s (retry {attempt}/{SUM_RATE_LIMIT_RETRIES})")
+				sched.pause(delay)
+			finally:
+				sched.release()
+
+	def scheduler_stats(self) -> Dict[str, Any]:
+		"""Queue, budget and rate-limit state of every backend scheduler."""
+		if self._loop is None or self._loop.is_closed():
+			return {}
+
+		async def _collect() -> Dict[str, Any]:
+			return {backend: sched.stats() for backend, sched in self._schedulers.get(asyncio.get_running_loop(), {}).items()}
+
+		return self.run(_collect())
+
+	def http_client(self) -> httpx.AsyncClient:
+		"""Shared client for coroutines running on the engine loop."""
+		if self._http is None or self._http.is_closed:
+			self._http = httpx.AsyncClient(
+				limits=httpx.Limits(
+					max_connections=SUM_HTTP_MAX_CONNECTIONS,
+					max_keepalive_connections=SUM_HTTP_MAX_CONNECTIONS,
+					keepalive_expiry=SUM_HTTP_KEEPALIVE_SECONDS,
+				),
+				timeout=httpx.Timeout(60.0),
+			)
+		return self._http
+
+	def run(self, coro: Awaitable[T]) -> T:
+		"""Run a coroutine on the engine loop and wait for its result."""
+		return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result()
+
+	def map_stream(self, backend: str, items: Iterable[T], fn: Callable[..., Awaitable[R]], emits: bool = False) -> Iterator[R]:
+		"""Run ``fn`` over items concurrently, yielding results in completion order.
+
+		At most ``concurrency(backend)`` items are in progress per call, and
+		items are pulled from ``items`` only when one finishes, so a lazily built
+		sequence (e.g. adaptive batches) can react to earlier results. Requests
+		made by ``fn`` are admitted by the backend scheduler via ``submit``.
+		With ``emits=True``, ``fn`` is called as ``fn(item, emit)`` and every
+		value passed to ``emit`` is yielded as soon as it arrives; emitted values
+		always come before their item's final result.
+		"""
+		loop = self._ensure_loop()
+		done: "queue.Queue[Any]" = queue.Queue()
+		source = iter(items)
+		pending: Set[Any] = set()
+
+		def _emit(value: R) -> None:
+			done.put(_Emitted(value))
+
+		def _submit() -> None:
+			for item in source:
+				coro = fn(item, _emit) if emits else fn(item)
+				fut = asyncio.run_coroutine_threadsafe(coro, loop)
+				pending.add(fut)
+				fut.add_done_callback(done.put)
+				return
+
+		try:
+			for _ in range(self.concurrency(backend)):
+				_submit()
+			while pending:
+				msg = done.get()
+				if isinstance(msg, _Emitted):
+					yield msg.value
+					continue
+				pending.discard(msg)
+				result = msg.result()
+				_submit()
+				yield result
+		finally:
+			# Stop scheduled work if the consumer gives up early
+			for fut in pending:
+				fut.cancel()
+
+	def close(self) -> None:
+		with self._lock:
+			loop, self._loop = self._loop, None
+			thread, self._thread = self._thread, None
+		if loop is None or loop.is_closed():
+			return
+		if self._http is not None:
+			try:
+				asyncio.run_coroutine_threadsafe(self._http.aclose(), loop).result(timeout=5)
+			except Exception:
+				pass
+			self._http = None
+		loop.call_soon_threadsafe(loop.stop)
+		if thread is not None:
+			thread.join(timeout=5)
+		loop.close()
+		# Only this loop's schedulers go; a loop started meanwhile keeps its own
+		self._schedulers.pop(loop, None)
+
+
+_engine = AsyncBatchEngine()
+
+
+def get_engine() -> AsyncBatchEngine:
+	return _engine
@@ -0,0 +1,63 @@
+"""Compare sentiment engines on sample data.
+
+Usage:
+	python -m backend.bench_sentiment --model roberta --engines torch,onnx,onnx-int8 \\
+		docs/sample_data/long_comments.csv docs/sample_data/mixed_200.csv
+
+The first engine is the reference: other engines report label agreement and
+mean absolute score difference against it. Caches are bypassed so every
+engine does the full inference work.
+"""
+import argparse
+import time
+from pathlib import Path
+from typing import List
+
+from .sentiment import ENGINES, MODEL_IDS, SentimentAnalyzer
+from .utils import iter_files_to_comments
+
+
+def load_texts(paths: List[str]) -> List[str]:
+	texts: List[str] = []
+	for p in paths:
+		with open(p, "rb") as fh:
+			texts.extend(item["text"] for item in iter_files_to_comments([(Path(p).name, fh)]))
+	return texts
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("files", nargs="+", help="CSV/JSON/TXT files to score")
+	parser.add_argument("--model", default="roberta", choices=sorted(MODEL_IDS))
+	parser.add_argument("--engines", default=",".join(ENGINES), help=f"Comma-separated subset of {', '.join(ENGINES)}")
+	parser.add_argument("--repeat", type=int, default=3, help="Timed runs per engine (best is reported)")
+	args = parser.parse_args()
+
+	engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+	unknown = [e for e in engines if e not in ENGINES]
+	if unknown:
+		parser.error(f"unknown engine(s): {', '.join(unknown)}")
+	texts = load_texts(args.files)
+	print(f"Scoring {len(texts)} comments with {args.model} ({MODEL_IDS[args.model]})")
+	reference = None
+	print(f"{'engine':<10} {'load s':>8} {'best s':>8} {'comments/s':>11} {'speedup':>8} {'agree':>7} {'|Δscore|':>9}")
+	for engine in engines:
+		t0 = time.perf_counter()
+		analyzer = SentimentAnalyzer(args.model, engine=engine)
+		load_s = time.perf_counter() - t0
+		analyzer._predict_uncached(texts[:8])  # warm-up
+		best = float("inf")
+		for _ in range(max(1, args.repeat)):
+			t0 = time.perf_counter()
+			labels, scores, _ = analyzer._predict_uncached(texts)
+			best = min(best, time.perf_counter() - t0)
+		if reference is None:
+			reference = (best, labels, scores)
+		ref_best, ref_labels, ref_scores = reference
+		agree = sum(1 for a, b in zip(labels, ref_labels) if a == b) / len(texts)
+		score_diff = sum(abs(a - b) for a, b in zip(scores, ref_scores)) / len(texts)
+		print(f"{analyzer.engine:<10} {load_s:>8.2f} {best:>8.2f} {len(texts) / best:>11.1f} {ref_best / best:>7.2f}x {agree:>7.1%} {score_diff:>9.4f}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,79 @@
+import os
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .db import executemany, fetchall
+
+SENTIMENT_CACHE_ENABLED = os.getenv("SENTIMENT_CACHE", "1") != "0"
+SUMMARY_CACHE_ENABLED = os.getenv("SUMMARY_CACHE", "1") != "0"
+# Keep IN (...) lists well under SQLite's host parameter limit
+_LOOKUP_CHUNK = 500
+
+
+def content_key(*parts: str) -> str:
+	"""Stable content address for a tuple of strings."""
+	h = hashlib.sha256()
+	for p in parts:
+		h.update(p.encode("utf-8"))
+		h.update(b"\x00")
+	return h.hexdigest()
+
+
+def sentiment_cache_key(model_type: str, cleaned_text: str) -> str:
+	return content_key("sentiment", model_type, cleaned_text)
+
+
+def get_cached_sentiments(keys: Sequence[str]) -> Dict[str, Tuple[str, float, Optional[bytes]]]:
+	"""Look up cached (label, score, packed probabilities); probabilities are None for entries cached before they were stored."""
+	found: Dict[str, Tuple[str, float, Optional[bytes]]] = {}
+	unique = list(dict.fromkeys(keys))
+	for i in range(0, len(unique), _LOOKUP_CHUNK):
+		chunk = unique[i:i + _LOOKUP_CHUNK]
+		rows = fetchall(
+			f"SELECT key, label, score, probs FROM sentiment_cache WHERE key IN ({','.join('?' * len(chunk))})",
+			tuple(chunk),
+		)
+		for r in rows:
+			found[r["key"]] = (r["label"], float(r["score"]), r["probs"])
+	return found
+
+
+def put_cached_sentiments(model_type: str, entries: List[Tuple[str, str, float, bytes]]) -> None:
+	"""Store (key, label, score, packed probabilities) entries, replacing older entries for the same key."""
+	if not entries:
+		return
+	now = datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+	executemany(
+		"INSERT OR REPLACE INTO sentiment_cache (key, model, label, score, probs, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+		[(key, model_type, label, float(score), probs, now) for key, label, score, probs in entries],
+	)
+
+
+def summary_cache_key(cleaned_text: str, backend: str, model_name: str, rules_version: str, max_words: int) -> str:
+	return content_key("summary", cleaned_text, backend, model_name, rules_version, str(max_words))
+
+
+def get_cached_summaries(keys: Sequence[str]) -> Dict[str, str]:
+	found: Dict[str, str] = {}
+	unique = list(dict.fromkeys(keys))
+	for i in range(0, len(unique), _LOOKUP_CHUNK):
+		chunk = unique[i:i + _LOOKUP_CHUNK]
+		rows = fetchall(
+			f"SELECT key, summary FROM summary_cache WHERE key IN ({','.join('?' * len(chunk))})",
+			tuple(chunk),
+		)
+		for r in rows:
+			found[r["key"]] = r["summary"]
+	return found
+
+
+def put_cached_summaries(backend: str, model_name: str, entries: List[Tuple[str, str]]) -> None:
+	"""Store (key, summary) pairs; existing keys are left untouched."""
+	if not entries:
+		return
+	now = datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+	executemany(
+		"INSERT OR IGNORE INTO summary_cache (key, backend, model, summary, created_at) VALUES (?, ?, ?, ?, ?)",
+		[(key, backend, model_name, summary, now) for key, summary in entries],
+	)
@@ -31,6 +31,9 @@ CREATE TABLE IF NOT EXISTS comments (
 	summary_model TEXT,
 	created_at TEXT,
 	external_file TEXT,
+	text_hash TEXT,
+	duplicate_count INTEGER,
+	sentiment_probs BLOB,
 	FOREIGN KEY(analysis_id) REFERENCES analyses(id) ON DELETE CASCADE
 );
 CREATE TABLE IF NOT EXISTS logs (
@@ -40,6 +43,28 @@ CREATE TABLE IF NOT EXISTS logs (
 	message TEXT,
 	context TEXT
 );
+CREATE TABLE IF NOT EXISTS sentiment_cache (
+	key TEXT PRIMARY KEY,
+	model TEXT,
+	label TEXT,
+	score REAL,
+	probs BLOB,
+	created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS summary_cache (
+	key TEXT PRIMARY KEY,
+	backend TEXT,
+	model TEXT,
+	summary TEXT,
+	created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS batch_tuning (
+	key TEXT PRIMARY KEY,
+	backend TEXT,
+	model TEXT,
+	state TEXT,
+	updated_at TEXT
+);
 CREATE INDEX IF NOT EXISTS idx_comments_analysis_id ON comments(analysis_id);
 '''
 
@@ -59,6 +84,18 @@ def init_db() -> None:
 			conn.execute("ALTER TABLE analyses ADD COLUMN sentiment_model TEXT")
 		except sqlite3.OperationalError:
 			pass  # Column already exists
+		# Add dedup and probability columns if they don't exist (migration)
+		for ddl in (
+			"ALTER TABLE comments ADD COLUMN text_hash TEXT",
+			"ALTER TABLE comments ADD COLUMN duplicate_count INTEGER",
+			"ALTER TABLE comments ADD COLUMN sentiment_probs BLOB",
+			"ALTER TABLE sentiment_cache ADD COLUMN probs BLOB",
+		):
+			try:
+				conn.execute(ddl)
+			except sqlite3.OperationalError:
+				pass  # Column already exists
+		conn.execute("CREATE INDEX IF NOT EXISTS idx_comments_analysis_text_hash ON comments(analysis_id, text_hash)")
 		conn.commit()
 	finally:
 		conn.close()
@@ -79,14 +116,16 @@ def get_conn() -> Iterable[sqlite3.Connection]:
 		conn.close()
 
 
-def execute(query: str, params: Tuple[Any, ...] = ()) -> None:
+def execute(query: str, params: Tuple[Any, ...] = ()) -> int:
+	"""Run a statement and return the number of rows it changed."""
 	with get_conn() as conn:
-		conn.execute(query, params)
+		return conn.execute(query, params).rowcount
 
 
-def executemany(query: str, params_seq: Iterable[Tuple[Any, ...]]) -> None:
+def executemany(query: str, params_seq: Iterable[Tuple[Any, ...]]) -> int:
+	"""Run a statement for each parameter tuple and return the total number of rows changed."""
 	with get_conn() as conn:
-		conn.executemany(query, params_seq)
+		return conn.executemany(query, params_seq).rowcount
 
 
 def fetchone(query: str, params: Tuple[Any, ...] = ()) -> Optional[sqlite3.Row]:
@@ -0,0 +1,125 @@
+import os
+import re
+import math
+from typing import Dict, List, Optional, Tuple
+
+from .summarizer import SUM_MAX_WORDS, _is_valid_summary, normalize_summary
+
+# Summarize comments of at most this many words locally instead of sending them to the LLM (0 = off)
+SUM_LOCAL_MAX_WORDS = int(os.getenv("SUM_LOCAL_MAX_WORDS", str(SUM_MAX_WORDS)))
+# Items per progress update when the local summarizer runs a whole analysis
+SUM_LOCAL_CHUNK_SIZE = int(os.getenv("SUM_LOCAL_CHUNK_SIZE", "500"))
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\s*\n+\s*")
+_WORD_RE = re.compile(r"[^\W_]+(?:'[^\W_]+)?")
+_STOPWORDS = frozenset(
+	"a an the and or but if of to in on at by for with from as is are was were be been being it its this that "
+	"these those i me my we our you your he she they them their his her so too very just than then there here "
+	"not no do does did have has had will would can could should am im it's i'm".split()
+)
+# PageRank damping and iteration limits for sentence ranking
+_DAMPING = 0.85
+_MAX_ITERATIONS = 50
+_TOLERANCE = 1e-4
+
+
+def split_sentences(text: str) -> List[str]:
+	return [s.strip() for s in _SENTENCE_RE.split(text.strip()) if s and s.strip()]
+
+
+def word_count(text: str) -> int:
+	return len(text.split())
+
+
+def _content_words(sentence: str) -> List[str]:
+	words = [w.lower() for w in _WORD_RE.findall(sentence)]
+	return [w for w in words if w not in _STOPWORDS] or words
+
+
+def rank_sentences(sentences: List[str]) -> List[float]:
+	"""TextRank scores: PageRank over a graph weighted by normalized word overlap between sentences."""
+	n = len(sentences)
+	if n < 2:
+		return [1.0] * n
+	words = [_content_words(s) for s in sentences]
+	sets = [set(w) for w in words]
+	weights = [[0.0] * n for _ in range(n)]
+	for i in range(n):
+		for j in range(i + 1, n):
+			overlap = len(sets[i] & sets[j])
+			if not overlap:
+				continue
+			norm = math.log(len(words[i]) + 1) + math.log(len(words[j]) + 1)
+			weights[i][j] = weights[j][i] = overlap / norm
+	out_weight = [sum(row) for row in weights]
+	scores = [1.0] * n
+	for _ in range(_MAX_ITERATIONS):
+		new = [
+			(1 - _DAMPING) + _DAMPING * sum(weights[j][i] / out_weight[j] * scores[j] for j in range(n) if weights[j][i])
+			for i in range(n)
+		]
+		delta = max(abs(a - b) for a, b in zip(new, scores))
+		scores = new
+		if delta < _TOLERANCE:
+			break
+	return scores
+
+
+def extract_summary(text: str) -> str:
+	"""Best-ranked sentence of ``text``, trimmed like LLM summaries; earlier sentences win ties."""
+	sentences = split_sentences(text)
+	if not sentences:
+		return ""
+	scores = rank_sentences(sentences)
+	# Favour longer sentences slightly so a bare "Thanks." does not beat the actual feedback
+	best = max(range(len(sentences)), key=lambda i: (scores[i] * math.log(len(_content_words(sentences[i])) + 2), -i))
+	# normalize_summary ends every summary with a single period
+	return normalize_summary(sentences[best].rstrip("!?.… "))
+
+
+class ExtractiveSummarizer:
+	"""Summarize comments on the CPU by picking each comment's most central sentence (TextRank).
+
+	Has the same interface as the LLM summarizers, so it can run a whole
+	analysis as summary model ``local``, and it backs ``route_local`` which
+	keeps short comments away from the LLM.
+	"""
+
+	backend = "local"
+	model_name = "textrank"
+
+	def check(self) -> None:
+		return None
+
+	def summarize_one(self, text: str) -> Dict[str, str]:
+		summary = extract_summary(text)
+		if not _is_valid_summary(summary):
+			return {"ok": False, "error": "Empty or invalid summary"}
+		return {"ok": True, "summary": summary, "backend": self.backend}
+
+	def summarize_in_batches(self, items: List[Tuple[str, str]], stats: Optional[Dict[str, int]] = None, job: str = "default") -> Dict[str, Dict[str, str]]:
+		return {cid: self.summarize_one(text) for cid, text in items}
+
+	def summarize_in_batches_stream(self, items: List[Tuple[str, str]], stats: Optional[Dict[str, int]] = None, job: str = "default"):
+		"""Yield results every SUM_LOCAL_CHUNK_SIZE items for progressive updates."""
+		size = max(1, SUM_LOCAL_CHUNK_SIZE)
+		for i in range(0, len(items), size):
+			yield self.summarize_in_batches(items[i:i + size])
+
+
+def route_local(summarizer: ExtractiveSummarizer, items: List[Tuple[str, str]], max_words: int = SUM_LOCAL_MAX_WORDS) -> Tuple[Dict[str, Dict[str, str]], List[Tuple[str, str]]]:
+	"""Split ``items`` into local summaries for comments of at most ``max_words`` words and the items left for the LLM.
+
+	Short comments whose extracted summary is not usable (emoji, bare
+	punctuation) stay with the LLM.
+	"""
+	local: Dict[str, Dict[str, str]] = {}
+	remaining: List[Tuple[str, str]] = []
+	for cid, text in items:
+		if max_words > 0 and word_count(text) <= max_words:
+			out = summarizer.summarize_one(text)
+			if out["ok"]:
+				local[cid] = out
+				continue
+		remaining.append((cid, text))
+	return local, remaining
@@ -0,0 +1,172 @@
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .async_engine import get_engine
+from .summarizer import stream_summaries
+
+# Send slow primary batches to the secondary backend as well and keep the first usable answer
+SUM_HEDGING = os.getenv("SUM_HEDGING", "1") != "0"
+# Hedge once a batch has run longer than the backend's recent p95 (never sooner than the minimum)
+SUM_HEDGE_MIN_SAMPLES = int(os.getenv("SUM_HEDGE_MIN_SAMPLES", "10"))
+SUM_HEDGE_MIN_SECONDS = float(os.getenv("SUM_HEDGE_MIN_SECONDS", "5"))
+# Hedge delay used until enough batches have been timed
+SUM_HEDGE_DEFAULT_SECONDS = float(os.getenv("SUM_HEDGE_DEFAULT_SECONDS", "30"))
+# Route every batch to the other backend while this share of recent batches failed
+SUM_FAILOVER_ERROR_RATE = float(os.getenv("SUM_FAILOVER_ERROR_RATE", "0.5"))
+SUM_FAILOVER_MIN_BATCHES = int(os.getenv("SUM_FAILOVER_MIN_BATCHES", "5"))
+SUM_FAILOVER_COOLDOWN_SECONDS = float(os.getenv("SUM_FAILOVER_COOLDOWN_SECONDS", "60"))
+# Number of recent batches kept per backend
+HEALTH_WINDOW = 50
+
+
+def _usable(result: Dict[str, Dict[str, Any]]) -> bool:
+	return any(r.get("ok") for r in result.values())
+
+
+class BackendHealth:
+	"""Recent batch latencies and failures per summarization backend, shared by all analyses.
+
+	A backend whose recent error rate crosses SUM_FAILOVER_ERROR_RATE is marked
+	failing for SUM_FAILOVER_COOLDOWN_SECONDS; after that its batches are tried
+	again and one more failure marks it failing straight away.
+	"""
+
+	def __init__(self) -> None:
+		self._latencies: Dict[str, Deque[float]] = {}
+		self._errors: Dict[str, Deque[bool]] = {}
+		self._failing_until: Dict[str, float] = {}
+
+	def record(self, backend: str, seconds: float, error: bool) -> None:
+		errors = self._errors.setdefault(backend, deque(maxlen=HEALTH_WINDOW))
+		errors.append(error)
+		if not error:
+			self._latencies.setdefault(backend, deque(maxlen=HEALTH_WINDOW)).append(seconds)
+			return
+		rate = sum(errors) / len(errors)
+		if len(errors) >= SUM_FAILOVER_MIN_BATCHES and rate > SUM_FAILOVER_ERROR_RATE and not self.failing(backend):
+			self._failing_until[backend] = time.monotonic() + SUM_FAILOVER_COOLDOWN_SECONDS
+			print(f"⚠️ FAILOVER: {backend} failed {rate:.0%} of recent batches, routing to the other backend for {SUM_FAILOVER_COOLDOWN_SECONDS:.0f}s")
+
+	def failing(self, backend: str) -> bool:
+		return time.monotonic() < self._failing_until.get(backend, 0.0)
+
+	def p95(self, backend: str) -> Optional[float]:
+		latencies = sorted(self._latencies.get(backend, ()))
+		if len(latencies) < SUM_HEDGE_MIN_SAMPLES:
+			return None
+		return latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+
+	def hedge_delay(self, backend: str) -> Optional[float]:
+		"""Seconds to wait for ``backend`` before hedging, or None when hedging is off."""
+		if not SUM_HEDGING:
+			return None
+		p95 = self.p95(backend)
+		return SUM_HEDGE_DEFAULT_SECONDS if p95 is None else max(SUM_HEDGE_MIN_SECONDS, p95)
+
+	def snapshot(self) -> Dict[str, Dict[str, Any]]:
+		out: Dict[str, Dict[str, Any]] = {}
+		for backend in set(self._errors) | set(self._latencies):
+			errors = list(self._errors.get(backend, ()))
+			p95 = self.p95(backend)
+			out[backend] = {
+				"batches": len(errors),
+				"error_rate": round(sum(errors) / len(errors), 3) if errors else 0.0,
+				"p95_seconds": round(p95, 2) if p95 is not None else None,
+				"failing": self.failing(backend),
+			}
+		return out
+
+
+backend_health = BackendHealth()
+
+
+class HedgedSummarizer:
+	"""Summarize with a primary backend, hedging slow batches on a secondary and failing over when it errors.
+
+	A batch still running after the primary's p95 latency is also sent to the
+	secondary; the first usable answer wins and the other request is
+	cancelled. A batch the primary fails outright is retried on the secondary,
+	and while the primary is marked failing every batch goes to the secondary
+	first. Each result records the backend that produced it.
+	"""
+
+	backend = "hybrid"
+
+	def __init__(self, primary, secondary) -> None:
+		self.primary = primary
+		self.secondary = secondary
+		self.model_name = f"{primary.backend}:{primary.model_name}+{secondary.backend}:{secondary.model_name}"
+		# Batches are sized from what was learned for the primary backend
+		self.tuning_key = (primary.backend, primary.model_name)
+		self.stats: Dict[str, Any] = {"batches": 0, "hedged": 0, "hedge_wins": 0, "failover_batches": 0, "by_backend": {}}
+
+	def summarize_in_batches(self, items: List[Tuple[str, str]], stats: Optional[Dict[str, int]] = None, job: str = "default") -> Dict[str, Dict[str, str]]:
+		results: Dict[str, Dict[str, str]] = {cid: {"ok": False} for cid, _ in items}
+		for batch_result in self.summarize_in_batches_stream(items, stats, job):
+			for cid, payload in batch_result.items():
+				results[cid] = payload
+		return results
+
+	def summarize_in_batches_stream(self, items: List[Tuple[str, str]], stats: Optional[Dict[str, int]] = None, job: str = "default"):
+		"""Yield results per completed batch for progressive updates (see ``stream_summaries``)."""
+		yield from stream_summaries(self, items, stats, job)
+
+	def _process_one_batch(self, batch: List[Tuple[str, str]]) -> Dict[str, Dict[str, str]]:
+		return get_engine().run(self._process_one_batch_async(batch))
+
+	async def _timed(self, summarizer, batch: List[Tuple[str, str]], retry: bool, job: str):
+		started = time.perf_counter()
+		try:
+			result = await summarizer._process_one_batch_async(batch, retry=retry, job=job)
+		except Exception as e:
+			result = {cid: {"ok": False, "error": str(e)} for cid, _ in batch}
+		backend_health.record(summarizer.backend, time.perf_counter() - started, error=not _usable(result))
+		return summarizer, result
+
+	async def _process_one_batch_async(self, batch: List[Tuple[str, str]], retry: bool = False, job: str = "default") -> Dict[str, Dict[str, str]]:
+		self.stats["batches"] += 1
+		first, second = self.primary, self.secondary
+		if backend_health.failing(first.backend) and not backend_health.failing(second.backend):
+			first, second = second, first
+			self.stats["failover_batches"] += 1
+		tasks = {asyncio.ensure_future(self._timed(first, batch, retry, job))}
+		hedged = latency_hedge = False
+		winner = None
+		try:
+			delay = backend_health.hedge_delay(first.backend)
+			if delay is not None:
+				done, _ = await asyncio.wait(tasks, timeout=delay)
+				if not done:
+					print(f"⚠️ HEDGE: {first.backend} batch of {len(batch)} still running after {delay:.1f}s, also sending it to {second.backend}")
+					tasks.add(asyncio.ensure_future(self._timed(second, batch, retry, job)))
+					hedged = latency_hedge = True
+					self.stats["hedged"] += 1
+			while tasks:
+				done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+				for task in done:
+					summarizer, result = task.result()
+					if winner is None or (not _usable(winner[1]) and _usable(result)):
+						winner = (summarizer, result)
+				if _usable(winner[1]):
+					break
+				if not hedged:
+					# The first backend failed the whole batch: fail over for this batch
+					print(f"⚠️ FAILOVER: {winner[0].backend} failed a batch of {len(batch)}, retrying it on {second.backend}")
+					tasks.add(asyncio.ensure_future(self._timed(second, batch, retry, job)))
+					hedged = True
+					self.stats["failover_batches"] += 1
+		finally:
+			for task in tasks:
+				task.cancel()
+		summarizer, result = winner
+		if latency_hedge and summarizer is second and _usable(result):
+			self.stats["hedge_wins"] += 1
+		by_backend = self.stats["by_backend"]
+		for out in result.values():
+			if out.get("ok"):
+				out["backend"] = summarizer.backend
+				by_backend[summarizer.backend] = by_backend.get(summarizer.backend, 0) + 1
+		return result
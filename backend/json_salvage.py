@@ -0,0 +1,157 @@
+import re
+import json
+from typing import Any, Dict, List, Optional
+
+# Key set on placeholders for objects that could not be parsed even after repair
+UNRECOVERABLE = "_unrecoverable"
+
+_VALID_ESCAPES = set('"\\/bfnrtu')
+_INDEX_RE = re.compile(r'"i"\s*:\s*"?(\d+)')
+_ID_RE = re.compile(r'"id"\s*:\s*"([^"\\]+)"')
+
+
+class JsonObjectScanner:
+	"""Pull top-level JSON objects out of LLM output in one incremental pass.
+
+	Text can be fed in arbitrary chunks (e.g. a streamed response); each
+	``feed`` returns the objects completed by that chunk. Anything outside
+	objects (code fences, prose, the enclosing array) is ignored. Common model
+	mistakes are repaired per object: unescaped quotes inside strings (a quote
+	only closes a string when followed by ``:``, ``}``, ``]`` or a ``,`` that
+	starts the next key/object or trails before a bracket), raw line breaks,
+	invalid escapes and trailing commas.
+	An object that still does not parse is returned as a placeholder
+	``{UNRECOVERABLE: raw, "i"/"id": ...}`` so it keeps its slot and only that
+	item is retried.
+	"""
+
+	def __init__(self) -> None:
+		self._buf = ""
+		self._depth = 0
+		self._in_str = False
+		self._escape = False
+		# Repaired text and original text of the object being read
+		self._obj: List[str] = []
+		self._raw: List[str] = []
+		self.objects = 0
+		self.repaired = 0
+		self.unrecoverable: List[Dict[str, Any]] = []
+
+	def feed(self, chunk: str) -> List[Any]:
+		self._buf += chunk
+		return self._scan(final=False)
+
+	def close(self) -> List[Any]:
+		"""Flush the remaining text; an unterminated object is reported as unrecoverable."""
+		out = self._scan(final=True)
+		if self._depth > 0:
+			out.append(self._salvage("".join(self._raw)))
+			self._reset_object()
+		self._buf = ""
+		return out
+
+	def _reset_object(self) -> None:
+		self._depth = 0
+		self._in_str = False
+		self._escape = False
+		self._obj = []
+		self._raw = []
+
+	def _closes_string(self, buf: str, j: int, final: bool) -> Optional[bool]:
+		"""Whether the quote before ``buf[j]`` ends the string; None until enough text has arrived."""
+		n = len(buf)
+		while j < n and buf[j] in " \t\r\n":
+			j += 1
+		if j >= n:
+			return True if final else None
+		if buf[j] in ":}]":
+			return True
+		if buf[j] != ",":
+			return False
+		j += 1
+		while j < n and buf[j] in " \t\r\n":
+			j += 1
+		if j >= n:
+			return True if final else None
+		return buf[j] in '"{}]'
+
+	def _scan(self, final: bool) -> List[Any]:
+		out: List[Any] = []
+		buf = self._buf
+		i = 0
+		n = len(buf)
+		while i < n:
+			ch = buf[i]
+			if self._depth == 0:
+				if ch == "{":
+					self._depth = 1
+					self._obj = ["{"]
+					self._raw = ["{"]
+				i += 1
+				continue
+			if self._in_str:
+				if self._escape:
+					self._escape = False
+					self._obj.append("\\" + ch if ch in _VALID_ESCAPES else ch)
+				elif ch == "\\":
+					self._escape = True
+				elif ch == '"':
+					closes = self._closes_string(buf, i + 1, final)
+					if closes is None:
+						break
+					self._in_str = not closes
+					self._obj.append('"' if closes else '\\"')
+				elif ch < " ":
+					self._obj.append(" ")
+				else:
+					self._obj.append(ch)
+			elif ch == '"':
+				self._in_str = True
+				self._obj.append(ch)
+			elif ch in "{[":
+				self._depth += 1
+				self._obj.append(ch)
+			elif ch in "}]":
+				# Drop a trailing comma before the closing bracket
+				while self._obj and self._obj[-1] in " \t\r\n":
+					self._obj.pop()
+				if self._obj and self._obj[-1] == ",":
+					self._obj.pop()
+				self._depth -= 1
+				self._obj.append(ch)
+				if self._depth == 0:
+					self._raw.append(ch)
+					out.append(self._finish())
+					i += 1
+					continue
+			else:
+				self._obj.append(ch)
+			self._raw.append(ch)
+			i += 1
+		self._buf = buf[i:]
+		return out
+
+	def _finish(self) -> Any:
+		text = "".join(self._obj)
+		raw = "".join(self._raw)
+		self._reset_object()
+		try:
+			obj = json.loads(text)
+		except ValueError:
+			return self._salvage(raw)
+		self.objects += 1
+		if text != raw:
+			self.repaired += 1
+		return obj
+
+	def _salvage(self, raw: str) -> Dict[str, Any]:
+		marker: Dict[str, Any] = {UNRECOVERABLE: raw[:200]}
+		m = _INDEX_RE.search(raw)
+		if m:
+			marker["i"] = int(m.group(1))
+		else:
+			m = _ID_RE.search(raw)
+			if m:
+				marker["id"] = m.group(1)
+		self.unrecoverable.append(marker)
+		return marker
@@ -0,0 +1,127 @@
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .model_manager import SentimentModelManager
+
+# How long the batcher waits for more requests after the first one arrives
+SENTIMENT_MICROBATCH_WINDOW_MS = float(os.getenv("SENTIMENT_MICROBATCH_WINDOW_MS", "5"))
+# Maximum number of texts scored in one micro-batch
+SENTIMENT_MICROBATCH_MAX_BATCH = int(os.getenv("SENTIMENT_MICROBATCH_MAX_BATCH", "64"))
+# Number of recent requests kept for latency percentiles
+LATENCY_SAMPLES = 1000
+
+
+class _Request:
+	def __init__(self, texts: List[str], future: "asyncio.Future") -> None:
+		self.texts = texts
+		self.future = future
+		self.started = time.perf_counter()
+
+
+class SentimentMicroBatcher:
+	"""Collect concurrent online sentiment requests into shared ``predict`` batches.
+
+	The first request for a model opens a batching window of ``window_ms``;
+	requests arriving within it (up to ``max_batch`` texts) are scored together
+	in a worker thread, off the event loop, and each caller's future resolves
+	with its own slice of the results.
+	"""
+
+	def __init__(self, models: SentimentModelManager, window_ms: float = SENTIMENT_MICROBATCH_WINDOW_MS, max_batch: int = SENTIMENT_MICROBATCH_MAX_BATCH) -> None:
+		self.models = models
+		self.window_ms = window_ms
+		self.max_batch = max(1, max_batch)
+		self._loop: Optional[asyncio.AbstractEventLoop] = None
+		self._queues: Dict[str, "asyncio.Queue[_Request]"] = {}
+		self._workers: Dict[str, "asyncio.Task"] = {}
+		self._latencies_ms: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+		self._batch_sizes: Deque[int] = deque(maxlen=LATENCY_SAMPLES)
+		self.requests = 0
+		self.batches = 0
+		self.errors = 0
+
+	async def predict(self, model_type: str, texts: List[str]) -> List[Tuple[str, float]]:
+		"""Score texts with ``model_type``, sharing a model batch with concurrent callers."""
+		loop = asyncio.get_running_loop()
+		if self._loop is not loop:
+			# Queues and worker tasks are bound to the loop that created them
+			self._loop = loop
+			self._queues = {}
+			self._workers = {}
+		queue = self._queues.get(model_type)
+		if queue is None:
+			queue = self._queues[model_type] = asyncio.Queue()
+			self._workers[model_type] = loop.create_task(self._worker(model_type, queue))
+		request = _Request(texts, loop.create_future())
+		await queue.put(request)
+		return await request.future
+
+	async def _worker(self, model_type: str, queue: "asyncio.Queue[_Request]") -> None:
+		loop = asyncio.get_running_loop()
+		while True:
+			batch = [await queue.get()]
+			size = len(batch[0].texts)
+			deadline = loop.time() + self.window_ms / 1000.0
+			while size < self.max_batch:
+				remaining = deadline - loop.time()
+				if remaining <= 0:
+					break
+				try:
+					request = await asyncio.wait_for(queue.get(), remaining)
+				except asyncio.TimeoutError:
+					break
+				batch.append(request)
+				size += len(request.texts)
+			texts = [t for r in batch for t in r.texts]
+			try:
+				labels, scores = await loop.run_in_executor(None, self._predict_batch, model_type, texts)
+			except Exception as e:
+				self.errors += 1
+				for r in batch:
+					if not r.future.done():
+						r.future.set_exception(e)
+				continue
+			self.batches += 1
+			self._batch_sizes.append(len(texts))
+			offset = 0
+			now = time.perf_counter()
+			for r in batch:
+				n = len(r.texts)
+				if not r.future.done():
+					r.future.set_result(list(zip(labels[offset:offset + n], scores[offset:offset + n])))
+				offset += n
+				self.requests += 1
+				self._latencies_ms.append((now - r.started) * 1000.0)
+
+	def _predict_batch(self, model_type: str, texts: List[str]) -> Tuple[List[str], List[float]]:
+		with self.models.use(model_type) as analyzer:
+			return analyzer.predict(texts)
+
+	def stats(self) -> Dict[str, Any]:
+		"""Batching configuration, throughput counters and latency percentiles over recent requests."""
+		latencies = sorted(self._latencies_ms)
+
+		def percentile(p: float) -> Optional[float]:
+			if not latencies:
+				return None
+			return round(latencies[min(len(latencies) - 1, int(p / 100.0 * len(latencies)))], 2)
+
+		sizes = list(self._batch_sizes)
+		return {
+			"window_ms": self.window_ms,
+			"max_batch": self.max_batch,
+			"requests": self.requests,
+			"batches": self.batches,
+			"errors": self.errors,
+			"avg_batch_size": round(sum(sizes) / len(sizes), 2) if sizes else None,
+			"latency_ms": {"p50": percentile(50), "p95": percentile(95), "p99": percentile(99)},
+		}
+
+	def close(self) -> None:
+		for task in self._workers.values():
+			task.cancel()
+		self._workers = {}
+		self._queues = {}
@@ -0,0 +1,194 @@
+import os
+import gc
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .model_store import is_stored
+from .sentiment import CASCADE, MODEL_IDS, SENTIMENT_CASCADE_FAST, CascadeSentimentAnalyzer, SentimentAnalyzer
+
+# Total memory the loaded sentiment models may use (0 = unlimited)
+SENTIMENT_MEMORY_BUDGET_MB = int(os.getenv("SENTIMENT_MEMORY_BUDGET_MB", "0"))
+# Models loaded and warmed up in the background at startup
+SENTIMENT_PRELOAD = [m.strip() for m in os.getenv("SENTIMENT_PRELOAD", "roberta").split(",") if m.strip()]
+
+
+class _ModelEntry:
+	def __init__(self) -> None:
+		self.state = "unloaded"  # unloaded | loading | ready | error | evicted
+		self.analyzer: Optional[SentimentAnalyzer] = None
+		self.memory_mb = 0.0
+		self.in_use = 0
+		self.last_used: Optional[float] = None
+		self.load_seconds: Optional[float] = None
+		self.load_phases: Dict[str, float] = {}
+		self.error: Optional[str] = None
+		self.load_lock = threading.Lock()
+
+
+class SentimentModelManager:
+	"""Owns loaded sentiment models: lazy/background loading, warm-up and LRU eviction under a memory budget.
+
+	Models are evicted least-recently-used first, and only while idle (no caller
+	holds them through ``use``).
+	"""
+
+	def __init__(self, factory: Callable[[str], SentimentAnalyzer], budget_mb: int = SENTIMENT_MEMORY_BUDGET_MB) -> None:
+		self._factory = factory
+		self.budget_mb = budget_mb
+		self._entries: Dict[str, _ModelEntry] = {m: _ModelEntry() for m in MODEL_IDS}
+		# Ready models, least recently used first
+		self._lru: "OrderedDict[str, None]" = OrderedDict()
+		self._lock = threading.Lock()
+
+	def _entry(self, model_type: str) -> _ModelEntry:
+		entry = self._entries.get(model_type)
+		if entry is None:
+			raise ValueError(f"Unknown sentiment model type: {model_type}")
+		return entry
+
+	def load(self, model_type: str) -> SentimentAnalyzer:
+		"""Return the ready analyzer, loading and warming it up first if needed."""
+		if model_type == CASCADE:
+			# Pin the fast stage while RoBERTa loads so the memory budget cannot evict it
+			with self.use(SENTIMENT_CASCADE_FAST) as fast, self.use("roberta") as strong:
+				return CascadeSentimentAnalyzer(fast, strong)
+		entry = self._entry(model_type)
+		with entry.load_lock:
+			if entry.state == "ready" and entry.analyzer is not None:
+				self._touch(model_type)
+				return entry.analyzer
+			entry.state = "loading"
+			entry.error = None
+			print(f"🔄 Loading sentiment model {model_type}...")
+			t0 = time.perf_counter()
+			try:
+				analyzer = self._factory(model_type)
+				t1 = time.perf_counter()
+				analyzer.warm_up()
+			except Exception as e:
+				entry.state = "error"
+				entry.error = str(e)
+				print(f"❌ Error loading sentiment model {model_type}: {e}")
+				raise
+			entry.load_seconds = round(time.perf_counter() - t0, 2)
+			# Worker pools load inside their processes, so only the total construction time is known here
+			entry.load_phases = dict(getattr(analyzer, "load_phases", None) or {"construct": round(t1 - t0, 2)})
+			entry.load_phases["warm_up"] = round(time.perf_counter() - t1, 2)
+			entry.memory_mb = round(analyzer.memory_mb(), 1)
+			with self._lock:
+				entry.analyzer = analyzer
+				entry.state = "ready"
+			self._touch(model_type)
+			phases = ", ".join(f"{k} {v}s" for k, v in entry.load_phases.items())
+			print(f"✅ Sentiment model {model_type} ready in {entry.load_seconds}s ({phases}; ~{entry.memory_mb} MB)")
+		self._enforce_budget(keep=model_type)
+		return analyzer
+
+	@contextmanager
+	def use(self, model_type: str) -> Iterator[SentimentAnalyzer]:
+		"""Hold a model for the duration of a job so it cannot be evicted mid-use."""
+		if model_type == CASCADE:
+			# Hold both stages of the cascade
+			with self.use(SENTIMENT_CASCADE_FAST) as fast, self.use("roberta") as strong:
+				yield CascadeSentimentAnalyzer(fast, strong)
+			return
+		entry = self._entry(model_type)
+		with self._lock:
+			entry.in_use += 1
+		try:
+			yield self.load(model_type)
+		finally:
+			with self._lock:
+				entry.in_use -= 1
+				entry.last_used = time.time()
+
+	def loaded_models(self) -> List[str]:
+		ready = [m for m, e in self._entries.items() if e.state == "ready"]
+		if SENTIMENT_CASCADE_FAST in ready and "roberta" in ready:
+			ready.append(CASCADE)
+		return ready
+
+	def preload(self, model_types: List[str]) -> threading.Thread:
+		"""Load and warm up models on a background thread."""
+		def _run() -> None:
+			for m in model_types:
+				try:
+					self.load(m)
+				except Exception:
+					pass  # state/error already recorded on the entry
+		t = threading.Thread(target=_run, name="sentiment-preload", daemon=True)
+		t.start()
+		return t
+
+	def status(self) -> Dict[str, Any]:
+		with self._lock:
+			models = {
+				m: {
+					"state": e.state,
+					"in_use": e.in_use,
+					"memory_mb": e.memory_mb if e.state == "ready" else 0,
+					"load_seconds": e.load_seconds,
+					"load_phases": e.load_phases,
+					"in_model_store": is_stored(m),
+					"last_used": e.last_used,
+					"error": e.error,
+				}
+				for m, e in self._entries.items()
+			}
+		return {
+			"loaded_models": self.loaded_models(),
+			"available_models": list(MODEL_IDS) + [CASCADE],
+			"memory_budget_mb": self.budget_mb or None,
+			"memory_used_mb": round(sum(v["memory_mb"] for v in models.values()), 1),
+			"models": models,
+		}
+
+	def close(self) -> None:
+		for m in list(self._lru):
+			self._evict(m, force=True)
+
+	def _touch(self, model_type: str) -> None:
+		with self._lock:
+			self._entries[model_type].last_used = time.time()
+			self._lru.pop(model_type, None)
+			self._lru[model_type] = None
+
+	def _enforce_budget(self, keep: str) -> None:
+		if not self.budget_mb:
+			return
+		# Models that were picked but got busy before they could be evicted
+		skipped = set()
+		while True:
+			with self._lock:
+				used = sum(self._entries[m].memory_mb for m in self._lru)
+				if used <= self.budget_mb:
+					return
+				victim = next((m for m in self._lru if m != keep and m not in skipped and self._entries[m].in_use == 0), None)
+			if victim is None:
+				print(f"⚠️ Sentiment models use ~{used:.0f} MB, over the {self.budget_mb} MB budget, but none are idle")
+				return
+			if not self._evict(victim):
+				skipped.add(victim)
+
+	def _evict(self, model_type: str, force: bool = False) -> bool:
+		"""Close and drop a model; returns False if it is gone already or (unless ``force``) in use again."""
+		entry = self._entries[model_type]
+		with entry.load_lock:
+			with self._lock:
+				analyzer = entry.analyzer
+				# A use() may have picked the model up since it was chosen as the victim
+				if analyzer is None or (entry.in_use > 0 and not force):
+					return False
+				entry.analyzer = None
+				entry.state = "evicted"
+				self._lru.pop(model_type, None)
+			close = getattr(analyzer, "close", None)
+			if close:
+				close()
+			del analyzer
+			gc.collect()
+		print(f"♻️ Evicted idle sentiment model {model_type} (~{entry.memory_mb} MB)")
+		return True
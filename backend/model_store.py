@@ -0,0 +1,96 @@
+import os
+import json
+import time
+import shutil
+import argparse
+from datetime import datetime
+from pathlib import Path
+from .db import DATA_DIR
+
+# Local copies of the sentiment models (safetensors weights + tokenizer), one folder per model type
+MODEL_STORE_DIR = Path(os.getenv("MODEL_STORE_DIR", str(DATA_DIR / "models")))
+# 1 = never contact the Hugging Face hub; models must be prefetched into the store
+SENTIMENT_OFFLINE = os.getenv("SENTIMENT_OFFLINE", "0") == "1"
+
+if SENTIMENT_OFFLINE:
+	os.environ.setdefault("HF_HUB_OFFLINE", "1")
+	os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+
+def stored_model_dir(model_type: str) -> Path:
+	return MODEL_STORE_DIR / model_type
+
+
+def is_stored(model_type: str) -> bool:
+	d = stored_model_dir(model_type)
+	return (d / "config.json").exists() and any(d.glob("*.safetensors"))
+
+
+def resolve_model_source(model_type: str, model_id: str) -> str:
+	"""Return the local store folder for a model if present, else its hub id.
+
+	Safetensors weights in the store are memory-mapped on load, and no hub
+	lookups are made. With SENTIMENT_OFFLINE=1 a missing model is an error.
+	"""
+	if is_stored(model_type):
+		return str(stored_model_dir(model_type))
+	if SENTIMENT_OFFLINE:
+		raise RuntimeError(
+			f"Sentiment model {model_type} is not in the local model store ({stored_model_dir(model_type)}) and SENTIMENT_OFFLINE=1. "
+			f"Run: python -m backend.model_store prefetch {model_type}"
+		)
+	return model_id
+
+
+def prefetch(model_type: str, model_id: str, force: bool = False) -> Path:
+	"""Download a model from the hub and save it into the store as safetensors."""
+	dest = stored_model_dir(model_type)
+	if is_stored(model_type) and not force:
+		print(f"✅ {model_type} already in model store at {dest}")
+		return dest
+	from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+	t0 = time.perf_counter()
+	print(f"🔄 Prefetching {model_type} ({model_id}) into {dest}")
+	tmp = dest.with_name(dest.name + ".tmp")
+	shutil.rmtree(tmp, ignore_errors=True)
+	tmp.mkdir(parents=True)
+	AutoTokenizer.from_pretrained(model_id).save_pretrained(tmp)
+	AutoModelForSequenceClassification.from_pretrained(model_id).save_pretrained(tmp, safe_serialization=True)
+	(tmp / "store.json").write_text(json.dumps({
+		"model_type": model_type,
+		"model_id": model_id,
+		"prefetched_at": datetime.utcnow().replace(microsecond=0).isoformat() + "Z",
+	}, indent=2))
+	# Swap in the complete copy so a partial download is never picked up as stored
+	shutil.rmtree(dest, ignore_errors=True)
+	tmp.rename(dest)
+	print(f"✅ {model_type} stored in {time.perf_counter() - t0:.1f}s")
+	return dest
+
+
+def main() -> None:
+	from .sentiment import MODEL_IDS
+
+	parser = argparse.ArgumentParser(prog="python -m backend.model_store", description="Manage the local sentiment model store.")
+	sub = parser.add_subparsers(dest="command", required=True)
+	p_fetch = sub.add_parser("prefetch", help="Download models into the store")
+	p_fetch.add_argument("models", nargs="*", help=f"Model types: {', '.join(MODEL_IDS)} (default: all)")
+	p_fetch.add_argument("--force", action="store_true", help="Re-download models already in the store")
+	sub.add_parser("list", help="Show which models are stored")
+	args = parser.parse_args()
+
+	if args.command == "list":
+		for model_type, model_id in MODEL_IDS.items():
+			state = "stored" if is_stored(model_type) else "missing"
+			print(f"{model_type:<12} {state:<8} {model_id} -> {stored_model_dir(model_type)}")
+		return
+	unknown = [m for m in args.models if m not in MODEL_IDS]
+	if unknown:
+		parser.error(f"unknown model type(s): {', '.join(unknown)}")
+	for model_type in args.models or list(MODEL_IDS):
+		prefetch(model_type, MODEL_IDS[model_type], force=args.force)
+
+
+if __name__ == "__main__":
+	main()
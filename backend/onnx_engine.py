@@ -0,0 +1,51 @@
+from pathlib import Path
+from typing import Optional
+
+from .db import DATA_DIR
+
+# Exported (and optionally int8-quantized) ONNX models, one folder per hub model
+ONNX_DIR = DATA_DIR / "onnx"
+
+
+def onnx_artifact_dir(model_id: str, quantized: bool) -> Path:
+	return ONNX_DIR / model_id.replace("/", "--") / ("int8" if quantized else "fp32")
+
+
+def load_onnx_pipeline(model_id: str, quantize: bool = False, source: Optional[str] = None):
+	"""Build a text-classification pipeline backed by ONNX Runtime.
+
+	The model is exported to ONNX on first use and, if ``quantize`` is set,
+	dynamically quantized to int8. Both artifacts are cached under DATA_DIR/onnx.
+	Labels come from the exported config, so they match the torch pipeline.
+	``source`` is where the export reads weights from (a model store folder or
+	the hub id); artifacts are always keyed by ``model_id``.
+	"""
+	try:
+		from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+		from optimum.onnxruntime.configuration import AutoQuantizationConfig
+	except ImportError as e:
+		raise RuntimeError("ONNX engine requires optimum with onnxruntime: pip install 'optimum[onnxruntime]'") from e
+	from transformers import AutoTokenizer, pipeline
+
+	fp32_dir = onnx_artifact_dir(model_id, quantized=False)
+	if not (fp32_dir / "model.onnx").exists():
+		source = source or model_id
+		print(f"🔄 Exporting {model_id} to ONNX at {fp32_dir}")
+		model = ORTModelForSequenceClassification.from_pretrained(source, export=True)
+		model.save_pretrained(fp32_dir)
+		AutoTokenizer.from_pretrained(source).save_pretrained(fp32_dir)
+
+	if not quantize:
+		model = ORTModelForSequenceClassification.from_pretrained(fp32_dir)
+		return pipeline("sentiment-analysis", model=model, tokenizer=AutoTokenizer.from_pretrained(fp32_dir))
+
+	int8_dir = onnx_artifact_dir(model_id, quantized=True)
+	if not (int8_dir / "model_quantized.onnx").exists():
+		print(f"🔄 Quantizing {model_id} to int8 at {int8_dir}")
+		quantizer = ORTQuantizer.from_pretrained(fp32_dir)
+		# Dynamic (weight-only calibration free) quantization; AVX2 kernels run on any modern x86 CPU
+		qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+		quantizer.quantize(save_dir=int8_dir, quantization_config=qconfig)
+		AutoTokenizer.from_pretrained(fp32_dir).save_pretrained(int8_dir)
+	model = ORTModelForSequenceClassification.from_pretrained(int8_dir, file_name="model_quantized.onnx")
+	return pipeline("sentiment-analysis", model=model, tokenizer=AutoTokenizer.from_pretrained(int8_dir))
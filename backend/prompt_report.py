@@ -0,0 +1,72 @@
+"""Compare summarization prompt sizes: legacy (UUID item markers) vs compact (numbered items).
+
+Usage:
+	python -m backend.prompt_report docs/sample_data/mixed_200.csv docs/sample_data/long_comments.csv
+	python -m backend.prompt_report --tokenizer google/gemma-3-1b-it docs/sample_data/*.csv
+
+Tokens are estimated at SUM_CHARS_PER_TOKEN characters per token unless
+--tokenizer names a Hugging Face tokenizer. Output tokens assume one
+SUM_MAX_WORDS-word summary per item in each format's JSON shape.
+"""
+import argparse
+import json
+import uuid
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+from .adaptive_batch import SUM_CHARS_PER_TOKEN
+from .bench_sentiment import load_texts
+from .summarizer import SUM_MAX_WORDS, build_compact_prompt, build_prompt, chunk_batches
+
+
+def make_counter(tokenizer: str) -> Callable[[str], int]:
+	if not tokenizer:
+		return lambda text: int(round(len(text) / SUM_CHARS_PER_TOKEN))
+	from transformers import AutoTokenizer
+
+	tok = AutoTokenizer.from_pretrained(tokenizer)
+	return lambda text: len(tok.encode(text, add_special_tokens=False))
+
+
+def measure(texts: List[str], count: Callable[[str], int]) -> Tuple[int, int, int, int, int]:
+	"""Batches and legacy/compact input and output tokens for one set of comments."""
+	items = [(str(uuid.uuid4()), t) for t in texts]
+	summary = " ".join(["word"] * SUM_MAX_WORDS)
+	batches = chunk_batches(items)
+	legacy_in = compact_in = legacy_out = compact_out = 0
+	for batch in batches:
+		legacy_in += count(build_prompt(batch))
+		compact_in += count(build_compact_prompt(batch))
+		legacy_out += count(json.dumps([{"id": cid, "summary": summary} for cid, _ in batch]))
+		compact_out += count(json.dumps([{"i": i, "s": summary} for i in range(1, len(batch) + 1)], separators=(",", ":")))
+	return len(batches), legacy_in, legacy_out, compact_in, compact_out
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("files", nargs="+", help="CSV/JSON/TXT files to measure")
+	parser.add_argument("--tokenizer", default="", help="Hugging Face tokenizer to count tokens with (default: character estimate)")
+	args = parser.parse_args()
+
+	count = make_counter(args.tokenizer)
+	print(f"{'file':<40} {'items':>6} {'batches':>7} {'legacy in':>10} {'compact in':>11} {'legacy out':>11} {'compact out':>12} {'saved':>7}")
+	totals = [0] * 6
+	for path in args.files:
+		texts = load_texts([path])
+		if not texts:
+			continue
+		row = (len(texts),) + measure(texts, count)
+		totals = [a + b for a, b in zip(totals, row)]
+		_print_row(Path(path).name, row)
+	if len(args.files) > 1:
+		_print_row("TOTAL", tuple(totals))
+
+
+def _print_row(name: str, row) -> None:
+	n, batches, legacy_in, legacy_out, compact_in, compact_out = row
+	saved = 1 - (compact_in + compact_out) / max(1, legacy_in + legacy_out)
+	print(f"{name:<40} {n:>6} {batches:>7} {legacy_in:>10} {compact_in:>11} {legacy_out:>11} {compact_out:>12} {saved:>7.1%}")
+
+
+if __name__ == "__main__":
+	main()
@@ -1,8 +1,12 @@
 from __future__ import annotations
+import os
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from .models import AnalysisStatus, SummaryStatus
 
+# Largest texts list accepted by POST /sentiment in one request
+SENTIMENT_REQUEST_MAX_TEXTS = int(os.getenv("SENTIMENT_REQUEST_MAX_TEXTS", "256"))
+
 
 class AnalysisOut(BaseModel):
 	id: str
@@ -26,5 +30,26 @@ class CommentOut(BaseModel):
 	summary_model: Optional[str] = None
 	created_at: str
 	external_file: Optional[str] = None
+	duplicate_count: Optional[int] = None
+
+
+class SentimentRequest(BaseModel):
+	text: Optional[str] = None
+	texts: Optional[List[str]] = Field(default=None, min_length=1, max_length=SENTIMENT_REQUEST_MAX_TEXTS)
+	model: str = "roberta"
+
+
+class SentimentResult(BaseModel):
+	label: str
+	score: float
+
+
+class SentimentResponse(BaseModel):
+	model: str
+	results: List[SentimentResult]
 
 
+class RelabelRequest(BaseModel):
+	neutral_margin: float = Field(default=0.0, ge=0.0, le=1.0)
+	min_confidence: float = Field(default=0.0, ge=0.0, le=1.0)
+	binary: bool = False
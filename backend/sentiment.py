@@ -1,48 +1,315 @@
-from typing import List, Tuple
-from transformers import pipeline
+import os
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+
+from .cache import SENTIMENT_CACHE_ENABLED, sentiment_cache_key, get_cached_sentiments, put_cached_sentiments
+from .model_store import resolve_model_source
+from .utils import clean_text, iter_batches
+
+# Padded tokens (batch size x longest sequence) allowed per forward pass, and a hard cap on batch size
+SENTIMENT_BATCH_TOKENS = int(os.getenv("SENTIMENT_BATCH_TOKENS", "8192"))
+SENTIMENT_MAX_BATCH = int(os.getenv("SENTIMENT_MAX_BATCH", "128"))
+# Texts scored per predict_iter chunk (the unit of persistence and progress)
+SENTIMENT_CHUNK_SIZE = int(os.getenv("SENTIMENT_CHUNK_SIZE", "256"))
+# Long-text mode: comments longer than the model's max length are scored as overlapping token windows
+SENTIMENT_LONG_TEXT = os.getenv("SENTIMENT_LONG_TEXT", "0") == "1"
+SENTIMENT_WINDOW_OVERLAP = int(os.getenv("SENTIMENT_WINDOW_OVERLAP", "64"))
+SENTIMENT_MAX_WINDOWS = int(os.getenv("SENTIMENT_MAX_WINDOWS", "32"))
+
+
+def token_budget_batches(order: List[int], lengths: List[int], budget: int = SENTIMENT_BATCH_TOKENS, max_batch: int = SENTIMENT_MAX_BATCH) -> List[List[int]]:
+	"""Group indices (already sorted by ascending length) so each batch's padded size stays within budget."""
+	batches: List[List[int]] = []
+	cur: List[int] = []
+	for i in order:
+		# Sorted ascending, so the newest item sets the padded length of the batch
+		if cur and ((len(cur) + 1) * lengths[i] > budget or len(cur) >= max_batch):
+			batches.append(cur)
+			cur = []
+		cur.append(i)
+	if cur:
+		batches.append(cur)
+	return batches
+
+
+MODEL_IDS = {
+	# 3-class sentiment (negative / neutral / positive)
+	"roberta": "cardiffnlp/twitter-roberta-base-sentiment-latest",
+	# 2-class sentiment (negative / positive)
+	"distilbert": "distilbert-base-uncased-finetuned-sst-2-english",
+}
+# Rough resident size per loaded model, used when parameters cannot be inspected (e.g. ONNX sessions)
+APPROX_MODEL_MB = {"roberta": 500, "distilbert": 270}
+ENGINES = ("torch", "onnx", "onnx-int8")
+# Default inference engine; SENTIMENT_ENGINE_<MODEL> (e.g. SENTIMENT_ENGINE_DISTILBERT) overrides per model
+SENTIMENT_ENGINE = os.getenv("SENTIMENT_ENGINE", "torch")
+# Cascade: the fast model scores everything, comments it is less sure about than the threshold go to RoBERTa
+CASCADE = "cascade"
+SENTIMENT_CASCADE_FAST = os.getenv("SENTIMENT_CASCADE_FAST", "distilbert")
+SENTIMENT_CASCADE_THRESHOLD = float(os.getenv("SENTIMENT_CASCADE_THRESHOLD", "0.9"))
+
+
+# Order of the stored probability vector; 2-class models store 0 for neutral
+SENTIMENT_CLASSES = ("negative", "neutral", "positive")
+
+
+def pack_probs(probs: List[float]) -> bytes:
+	"""Pack a class-probability vector as float16 bytes (6 bytes per comment)."""
+	return np.asarray(probs, dtype=np.float16).tobytes()
+
+
+def unpack_probs(blobs: List[bytes]) -> np.ndarray:
+	"""Unpack stored vectors into an (n, len(SENTIMENT_CLASSES)) float32 array."""
+	if not blobs:
+		return np.zeros((0, len(SENTIMENT_CLASSES)), dtype=np.float32)
+	return np.frombuffer(b"".join(blobs), dtype=np.float16).reshape(len(blobs), len(SENTIMENT_CLASSES)).astype(np.float32)
+
+
+def relabel_probs(probs: np.ndarray, neutral_margin: float = 0.0, min_confidence: float = 0.0, binary: bool = False) -> List[str]:
+	"""Derive labels from stored probabilities without running a model.
+
+	The top class wins (only negative/positive when ``binary``); a comment becomes
+	neutral when |P(positive) - P(negative)| < ``neutral_margin`` or its top
+	probability is below ``min_confidence``.
+	"""
+	neg, pos = SENTIMENT_CLASSES.index("negative"), SENTIMENT_CLASSES.index("positive")
+	if binary:
+		idx = np.where(probs[:, pos] >= probs[:, neg], pos, neg)
+	else:
+		idx = np.argmax(probs, axis=1)
+	top = probs[np.arange(len(probs)), idx]
+	neutral = (np.abs(probs[:, pos] - probs[:, neg]) < neutral_margin) | (top < min_confidence)
+	idx = np.where(neutral, SENTIMENT_CLASSES.index("neutral"), idx)
+	return [SENTIMENT_CLASSES[i] for i in idx]
+
+
+def engine_for(model_type: str) -> str:
+	return os.getenv(f"SENTIMENT_ENGINE_{model_type.upper()}", SENTIMENT_ENGINE)
 
 
 class SentimentAnalyzer:
-	def __init__(self, model_type: str = "roberta") -> None:
+	def __init__(self, model_type: str = "roberta", engine: Optional[str] = None) -> None:
 		self.model_type = model_type
-		if model_type == "roberta":
-			# Using cardiffnlp/twitter-roberta-base-sentiment-latest for proper 3-class sentiment analysis
-			self._pipe = pipeline("sentiment-analysis", model="cardiffnlp/twitter-roberta-base-sentiment-latest")
-		elif model_type == "distilbert":
-			# Using distilbert-base-uncased-finetuned-sst-2-english for 2-class sentiment analysis
-			self._pipe = pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
-		else:
+		if model_type not in MODEL_IDS:
 			raise ValueError(f"Unknown sentiment model type: {model_type}")
+		self.engine = engine or engine_for(model_type)
+		if self.engine not in ENGINES:
+			raise ValueError(f"Unknown sentiment engine: {self.engine}. Must be one of {', '.join(ENGINES)}")
+		# Seconds spent per loading phase, reported by the model manager
+		self.load_phases: Dict[str, float] = {}
+		t0 = time.perf_counter()
+		# Imported lazily so the API process does not pay the torch import before startup
+		from transformers import pipeline
+		t1 = time.perf_counter()
+		source = resolve_model_source(model_type, MODEL_IDS[model_type])
+		t2 = time.perf_counter()
+		if self.engine == "torch":
+			self._pipe = pipeline("sentiment-analysis", model=source)
+		else:
+			from .onnx_engine import load_onnx_pipeline
+			try:
+				self._pipe = load_onnx_pipeline(MODEL_IDS[model_type], quantize=self.engine == "onnx-int8", source=source)
+			except Exception as e:
+				# The ONNX engines are optional; keep analyses running on torch instead of failing them
+				print(f"⚠️ SENTIMENT DEBUG: {self.engine} engine unavailable for {model_type} ({e}), falling back to torch")
+				self.engine = "torch"
+				self._pipe = pipeline("sentiment-analysis", model=source)
+		t3 = time.perf_counter()
+		self.load_phases = {"import": round(t1 - t0, 2), "resolve": round(t2 - t1, 2), "weights": round(t3 - t2, 2)}
+		self.source = source
+
+	def memory_mb(self) -> float:
+		"""Approximate memory held by the model weights."""
+		model = getattr(self._pipe, "model", None)
+		try:
+			return sum(p.numel() * p.element_size() for p in model.parameters()) / (1024 * 1024)
+		except Exception:
+			return float(APPROX_MODEL_MB.get(self.model_type, 500))
+
+	def warm_up(self) -> None:
+		"""Run a dummy batch so the first real request does not pay lazy initialization."""
+		self._predict_uncached(["Warm-up sentence for the sentiment model."] * 4)
 
-	def predict(self, texts: List[str]) -> Tuple[List[str], List[float]]:
-		results = self._pipe(texts, truncation=True, batch_size=32)
-		labels: List[str] = []
-		scores: List[float] = []
-		for r in results:
-			raw_label = str(r.get("label", "")).lower()
-			score = float(r.get("score", 0.0))
-			
-			if self.model_type == "roberta":
-				# Map the model's labels to our expected format (3-class)
-				if raw_label == "positive":
-					label = "positive"
-				elif raw_label == "negative":
-					label = "negative"
-				elif raw_label == "neutral":
-					label = "neutral"
-				else:
-					# Fallback to neutral if unknown label
-					label = "neutral"
-			else:  # distilbert
-				# Pure 2-class: Only positive and negative (no artificial neutral)
-				if raw_label == "positive":
-					label = "positive"
-				elif raw_label == "negative":
-					label = "negative"
-				else:
-					# Fallback to positive if unknown label
-					label = "positive"
-
-			labels.append(label)
-			scores.append(score)
+	def predict(self, texts: List[str], stats: Optional[Dict[str, int]] = None) -> Tuple[List[str], List[float]]:
+		"""Label texts; returns (labels, top-class scores). See ``predict_full``."""
+		labels, scores, _ = self.predict_full(texts, stats)
 		return labels, scores
+
+	def predict_full(self, texts: List[str], stats: Optional[Dict[str, int]] = None) -> Tuple[List[str], List[float], List[bytes]]:
+		"""Label texts and return each one's packed class probabilities, running each distinct text through the model at most once.
+
+		Previously scored texts are served from the persistent cache. If ``stats``
+		is given, ``cache_hits``/``cache_misses``/``deduplicated`` are added to it.
+		"""
+		# Engines (and int8 quantization) and long-text mode score differently, so each gets its own cache entries
+		namespace = f"{self.model_type}@{self.engine}" + ("+long" if SENTIMENT_LONG_TEXT else "")
+		keys = [sentiment_cache_key(namespace, clean_text(t)) for t in texts]
+		unique: Dict[str, str] = {}
+		for k, t in zip(keys, texts):
+			unique.setdefault(k, t)
+		cached = get_cached_sentiments(list(unique)) if SENTIMENT_CACHE_ENABLED else {}
+		# Entries cached before probabilities were stored are scored again
+		cached = {k: v for k, v in cached.items() if v[2] is not None}
+		miss_keys = [k for k in unique if k not in cached]
+		if stats is not None:
+			hits = sum(1 for k in keys if k in cached)
+			stats["cache_hits"] = stats.get("cache_hits", 0) + hits
+			stats["cache_misses"] = stats.get("cache_misses", 0) + len(keys) - hits
+			stats["deduplicated"] = stats.get("deduplicated", 0) + len(keys) - len(unique)
+		if miss_keys:
+			miss_labels, miss_scores, miss_probs = self._predict_uncached([unique[k] for k in miss_keys])
+			new_entries = []
+			for k, label, score, probs in zip(miss_keys, miss_labels, miss_scores, miss_probs):
+				packed = pack_probs(probs)
+				cached[k] = (label, score, packed)
+				new_entries.append((k, label, score, packed))
+			if SENTIMENT_CACHE_ENABLED:
+				put_cached_sentiments(self.model_type, new_entries)
+		labels = [cached[k][0] for k in keys]
+		scores = [cached[k][1] for k in keys]
+		probs = [cached[k][2] for k in keys]
+		return labels, scores, probs
+
+	def predict_iter(self, items: Iterable[Tuple[Any, str]], chunk_size: int = SENTIMENT_CHUNK_SIZE, stats: Optional[Dict[str, int]] = None) -> Iterator[List[Tuple[Any, str, float, bytes]]]:
+		"""Score (key, text) pairs lazily, yielding [(key, label, score, packed_probs), ...] one chunk at a time.
+
+		Items are pulled from ``items`` only as each chunk is scored, so callers can
+		persist every chunk before the next one is read.
+		"""
+		for chunk in iter_batches(items, chunk_size):
+			labels, scores, probs = self.predict_full([text for _, text in chunk], stats)
+			yield [(key, labels[i], scores[i], probs[i]) for i, (key, _) in enumerate(chunk)]
+
+	def _predict_uncached(self, texts: List[str]) -> Tuple[List[str], List[float], List[List[float]]]:
+		"""Run the model over texts sorted by token length, batched under a padded-token budget.
+
+		In long-text mode each long text is split into overlapping windows first;
+		windows from all texts share batches and their probabilities are averaged
+		back per text, weighted by window token count. Returns labels, top-class
+		scores and full probability vectors in SENTIMENT_CLASSES order.
+		"""
+		if not texts:
+			return [], [], []
+		if SENTIMENT_LONG_TEXT:
+			pieces, owners, weights, lengths = self._split_windows(texts)
+		else:
+			pieces, owners, weights, lengths = texts, list(range(len(texts))), [1.0] * len(texts), self._token_lengths(texts)
+		order = sorted(range(len(pieces)), key=lambda i: lengths[i])
+		agg = np.zeros((len(texts), len(SENTIMENT_CLASSES)), dtype=np.float64)
+		totals = np.zeros(len(texts), dtype=np.float64)
+		for batch in token_budget_batches(order, lengths):
+			# top_k=None returns every class's score from the same forward pass
+			out = self._pipe([pieces[i] for i in batch], truncation=True, batch_size=len(batch), top_k=None)
+			for i, r in zip(batch, out):
+				agg[owners[i]] += weights[i] * np.asarray(self._probs_vector(r if isinstance(r, list) else [r]))
+				totals[owners[i]] += weights[i]
+		agg /= np.maximum(totals, 1e-9)[:, None]
+		top = agg.argmax(axis=1)
+		labels = [SENTIMENT_CLASSES[i] for i in top]
+		scores = [float(agg[n, i]) for n, i in enumerate(top)]
+		return labels, scores, agg.tolist()
+
+	def _probs_vector(self, results: List[Dict]) -> List[float]:
+		"""Map a pipeline's per-class results to a probability vector in SENTIMENT_CLASSES order."""
+		vec = [0.0] * len(SENTIMENT_CLASSES)
+		for c in results:
+			vec[SENTIMENT_CLASSES.index(self._map_label(str(c.get("label", "")).lower()))] += float(c.get("score", 0.0))
+		return vec
+
+	def _split_windows(self, texts: List[str]) -> Tuple[List[str], List[int], List[float], List[int]]:
+		"""Split texts into model-sized pieces: (pieces, owning text index, weight, padded token length).
+
+		Texts that fit are kept whole. Longer ones become windows of the model's
+		max length overlapping by SENTIMENT_WINDOW_OVERLAP tokens (at most
+		SENTIMENT_MAX_WINDOWS per text), so cost follows the real token count.
+		"""
+		tokenizer = self._pipe.tokenizer
+		max_len = min(int(getattr(tokenizer, "model_max_length", 512) or 512), 512)
+		special = tokenizer.num_special_tokens_to_add() if hasattr(tokenizer, "num_special_tokens_to_add") else 2
+		window = max_len - special
+		step = max(1, window - SENTIMENT_WINDOW_OVERLAP)
+		encoded = tokenizer(texts, add_special_tokens=False)["input_ids"]
+		pieces: List[str] = []
+		owners: List[int] = []
+		weights: List[float] = []
+		lengths: List[int] = []
+		for idx, (text, ids) in enumerate(zip(texts, encoded)):
+			if len(ids) <= window:
+				pieces.append(text)
+				owners.append(idx)
+				weights.append(float(max(1, len(ids))))
+				lengths.append(len(ids) + special)
+				continue
+			start = 0
+			for _ in range(max(1, SENTIMENT_MAX_WINDOWS)):
+				end = min(start + window, len(ids))
+				pieces.append(tokenizer.decode(ids[start:end]))
+				owners.append(idx)
+				weights.append(float(end - start))
+				lengths.append(end - start + special)
+				if end >= len(ids):
+					break
+				start += step
+		return pieces, owners, weights, lengths
+
+	def _token_lengths(self, texts: List[str]) -> List[int]:
+		tokenizer = self._pipe.tokenizer
+		max_len = min(int(getattr(tokenizer, "model_max_length", 512) or 512), 512)
+		encoded = tokenizer(texts, truncation=True, max_length=max_len)
+		return [len(ids) for ids in encoded["input_ids"]]
+
+	def _map_label(self, raw_label: str) -> str:
+		if self.model_type == "roberta":
+			# Map the model's labels to our expected format (3-class)
+			if raw_label in ("positive", "negative", "neutral"):
+				return raw_label
+			# Fallback to neutral if unknown label
+			return "neutral"
+		# distilbert: pure 2-class, only positive and negative (no artificial neutral)
+		if raw_label in ("positive", "negative"):
+			return raw_label
+		# Fallback to positive if unknown label
+		return "positive"
+
+
+class CascadeSentimentAnalyzer(SentimentAnalyzer):
+	"""Score with a cheap model first and re-score only low-confidence texts with RoBERTa.
+
+	Confident fast-model labels are kept as is. If ``stats`` is passed to
+	``predict_full``, the fast stage's cache counters and
+	``cascade_total``/``cascade_escalated`` are added to it.
+	"""
+
+	def __init__(self, fast: SentimentAnalyzer, strong: SentimentAnalyzer, threshold: float = SENTIMENT_CASCADE_THRESHOLD) -> None:
+		self.model_type = CASCADE
+		self.engine = f"{fast.engine}+{strong.engine}"
+		self.fast = fast
+		self.strong = strong
+		self.threshold = threshold
+
+	def predict_full(self, texts: List[str], stats: Optional[Dict[str, int]] = None) -> Tuple[List[str], List[float], List[bytes]]:
+		labels, scores, probs = self.fast.predict_full(texts, stats)
+		escalate = [i for i, score in enumerate(scores) if score < self.threshold]
+		if escalate:
+			# Cache counters describe the comments once (fast stage); the strong stage's lookups are not added on top
+			strong_labels, strong_scores, strong_probs = self.strong.predict_full([texts[i] for i in escalate], {})
+			for j, i in enumerate(escalate):
+				labels[i] = strong_labels[j]
+				scores[i] = strong_scores[j]
+				probs[i] = strong_probs[j]
+		if stats is not None:
+			stats["cascade_total"] = stats.get("cascade_total", 0) + len(texts)
+			stats["cascade_escalated"] = stats.get("cascade_escalated", 0) + len(escalate)
+		return labels, scores, probs
+
+	def _predict_uncached(self, texts: List[str]) -> Tuple[List[str], List[float], List[List[float]]]:
+		labels, scores, probs = self.predict_full(texts)
+		return labels, scores, [unpack_probs([p])[0].tolist() for p in probs]
+
+	def memory_mb(self) -> float:
+		return self.fast.memory_mb() + self.strong.memory_mb()
+
+	def warm_up(self) -> None:
+		self.fast.warm_up()
+		self.strong.warm_up()
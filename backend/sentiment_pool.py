@@ -0,0 +1,103 @@
+import os
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from .sentiment import APPROX_MODEL_MB, SentimentAnalyzer, engine_for
+
+# Number of inference processes per model (0 keeps inference in the API process)
+SENTIMENT_WORKERS = int(os.getenv("SENTIMENT_WORKERS", "0"))
+# torch intra-op threads per worker; workers x threads should not exceed the core count
+SENTIMENT_WORKER_THREADS = int(os.getenv("SENTIMENT_WORKER_THREADS", "1"))
+# "spawn" loads a model per worker; "fork" loads once in the parent and shares weights copy-on-write
+SENTIMENT_POOL_START = os.getenv("SENTIMENT_POOL_START", "spawn")
+
+# Analyzer owned by the current worker process
+_worker_analyzer: Optional[SentimentAnalyzer] = None
+
+
+def _limit_threads(threads: int) -> None:
+	try:
+		import torch
+		torch.set_num_threads(max(1, threads))
+	except ImportError:
+		pass
+
+
+def _init_worker(model_type: str, engine: str, threads: int, analyzer: Optional[SentimentAnalyzer] = None) -> None:
+	global _worker_analyzer
+	_limit_threads(threads)
+	# Forked workers inherit the parent's analyzer through initargs (not pickled under fork)
+	_worker_analyzer = analyzer if analyzer is not None else SentimentAnalyzer(model_type, engine=engine)
+	print(f"✅ Sentiment worker {os.getpid()} ready ({model_type}/{engine}, {threads} thread(s))")
+
+
+def _worker_predict(texts: List[str]) -> Tuple[List[str], List[float], List[List[float]]]:
+	return _worker_analyzer._predict_uncached(texts)
+
+
+class SentimentWorkerPool(SentimentAnalyzer):
+	"""Drop-in SentimentAnalyzer that shards inference across worker processes.
+
+	Caching and deduplication still happen in the calling process (inherited
+	``predict``); only cache misses are split into contiguous shards, scored in
+	parallel and merged back in order.
+	"""
+
+	def __init__(self, model_type: str = "roberta", engine: Optional[str] = None, processes: int = SENTIMENT_WORKERS, threads: int = SENTIMENT_WORKER_THREADS, start_method: str = SENTIMENT_POOL_START) -> None:
+		self.model_type = model_type
+		self.engine = engine or engine_for(model_type)
+		self.processes = max(1, processes)
+		self.start_method = start_method
+		# Loaded once here under fork; workers inherit the weights without copying them
+		self._parent_analyzer: Optional[SentimentAnalyzer] = SentimentAnalyzer(model_type, engine=self.engine) if start_method == "fork" else None
+		ctx = multiprocessing.get_context(start_method)
+		self._executor = ProcessPoolExecutor(
+			max_workers=self.processes,
+			mp_context=ctx,
+			initializer=_init_worker,
+			initargs=(model_type, self.engine, threads, self._parent_analyzer),
+		)
+		# Start every worker now so model loading is not paid by the first request
+		list(self._executor.map(_worker_predict, [[] for _ in range(self.processes)]))
+
+	def memory_mb(self) -> float:
+		per_model = float(APPROX_MODEL_MB.get(self.model_type, 500))
+		# Forked workers share the parent's weights; spawned workers each hold a copy
+		return per_model if self.start_method == "fork" else per_model * self.processes
+
+	def warm_up(self) -> None:
+		self._predict_uncached(["Warm-up sentence for the sentiment model."] * (4 * self.processes))
+
+	def _predict_uncached(self, texts: List[str]) -> Tuple[List[str], List[float], List[List[float]]]:
+		if not texts:
+			return [], [], []
+		if self._executor is None:
+			raise RuntimeError(f"Sentiment worker pool for {self.model_type} is closed")
+		shard_size = math.ceil(len(texts) / self.processes)
+		shards = [texts[i:i + shard_size] for i in range(0, len(texts), shard_size)]
+		labels: List[str] = []
+		scores: List[float] = []
+		probs: List[List[float]] = []
+		# map() yields in submission order, so concatenating restores the input order
+		for shard_labels, shard_scores, shard_probs in self._executor.map(_worker_predict, shards):
+			labels.extend(shard_labels)
+			scores.extend(shard_scores)
+			probs.extend(shard_probs)
+		return labels, scores, probs
+
+	def close(self) -> None:
+		if self._executor is None:
+			return
+		self._executor.shutdown(wait=False, cancel_futures=True)
+		# The executor keeps its initargs; drop it and the parent's copy of the weights so eviction actually frees them
+		self._executor = None
+		self._parent_analyzer = None
+
+
+def create_sentiment_analyzer(model_type: str) -> SentimentAnalyzer:
+	"""Build an in-process analyzer or a worker pool depending on SENTIMENT_WORKERS."""
+	if SENTIMENT_WORKERS > 0:
+		return SentimentWorkerPool(model_type)
+	return SentimentAnalyzer(model_type)
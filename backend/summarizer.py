@@ -1,21 +1,70 @@
 import os
+import re
 import json
 import time
+import asyncio
+import threading
+import httpx
 import requests
-from typing import Dict, List, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
 load_dotenv()
 
 import google.genai as genai
 
+from .async_engine import RateLimited, get_engine, parse_retry_after
+from .json_salvage import UNRECOVERABLE, JsonObjectScanner
+from .adaptive_batch import SUM_ADAPTIVE_BATCHING, SUM_CHARS_PER_TOKEN, SUM_ITEM_OVERHEAD_TOKENS, AdaptiveBatcher, estimate_tokens
+
 MAX_BATCH_CHARS = int(os.getenv("MAX_BATCH_CHARS", "18000"))
 # Hard cap for comments per batch (can be overridden), default now 200
 MAX_COMMENTS_PER_BATCH = int(os.getenv("MAX_COMMENTS_PER_BATCH", "200"))
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 SUM_MAX_WORDS = int(os.getenv("SUM_MAX_WORDS", "20"))
-SUM_CONCURRENCY = int(os.getenv("SUM_CONCURRENCY", "3"))
+# Failed items are re-batched together for up to this many extra rounds, backing off between rounds
+SUM_RETRY_ROUNDS = int(os.getenv("SUM_RETRY_ROUNDS", "2"))
+SUM_RETRY_BACKOFF_SECONDS = float(os.getenv("SUM_RETRY_BACKOFF_SECONDS", "2"))
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "gemma3:1b")
+# How long Ollama keeps the model loaded after a request (Ollama duration, e.g. "30m"; "-1" = forever)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "10"))
+# Stream Ollama completions and keep each summary as soon as its JSON object closes
+OLLAMA_STREAM = os.getenv("OLLAMA_STREAM", "1") != "0"
+# Overall limit for one streamed batch; summaries received before it are kept
+OLLAMA_STREAM_TIMEOUT = float(os.getenv("OLLAMA_STREAM_TIMEOUT", "120"))
+# Model listings (Gemini list_models, Ollama /api/tags) are reused for this long
+SUM_MODEL_CACHE_TTL_SECONDS = float(os.getenv("SUM_MODEL_CACHE_TTL_SECONDS", "300"))
+# Learned per backend/model batch limits; MAX_COMMENTS_PER_BATCH / MAX_BATCH_CHARS remain hard caps.
+# The token cap includes every item's overhead so a fully grown batch can reach the same size as chunk_batches.
+batch_tuner = AdaptiveBatcher(
+	MAX_COMMENTS_PER_BATCH,
+	int(MAX_BATCH_CHARS / SUM_CHARS_PER_TOKEN) + MAX_COMMENTS_PER_BATCH * SUM_ITEM_OVERHEAD_TOKENS,
+	MAX_BATCH_CHARS,
+)
+
+
+_model_listings: Dict[str, Tuple[float, Any]] = {}
+_model_listings_lock = threading.Lock()
+
+
+def cached_model_listing(key: str, fetch: Callable[[], Any], refresh: bool = False) -> Any:
+	"""Return ``fetch()``, reusing the last successful result for SUM_MODEL_CACHE_TTL_SECONDS."""
+	now = time.monotonic()
+	with _model_listings_lock:
+		hit = _model_listings.get(key)
+	if hit is not None and not refresh and now - hit[0] < SUM_MODEL_CACHE_TTL_SECONDS:
+		return hit[1]
+	value = fetch()
+	with _model_listings_lock:
+		_model_listings[key] = (now, value)
+	return value
+
+
+def clear_model_listings(prefix: str = "") -> None:
+	with _model_listings_lock:
+		for key in [k for k in _model_listings if k.startswith(prefix)]:
+			del _model_listings[key]
 
 
 def chunk_batches(items: List[Tuple[str, str]]) -> List[List[Tuple[str, str]]]:
@@ -72,6 +121,12 @@ def chunk_batches(items: List[Tuple[str, str]]) -> List[List[Tuple[str, str]]]:
 	return batches
 
 
+# "compact" (positional indices, short keys) or "legacy" (UUID item markers, build_prompt)
+SUM_PROMPT_FORMAT = os.getenv("SUM_PROMPT_FORMAT", "compact")
+# Bump whenever the rules or item format of a prompt builder change; part of the summary cache key
+PROMPT_RULES_VERSION = "2" if SUM_PROMPT_FORMAT == "compact" else "1"
+
+
 def build_prompt(batch: list[tuple[str, str]]) -> str:
 
     def _escape(s: str) -> str:
@@ -111,79 +166,92 @@ def build_prompt(batch: list[tuple[str, str]]) -> str:
     return "\n".join(parts)
 
 
-def parse_json_array(text: str):
-	print(f"🔍 JSON DEBUG: Parsing text: {text[:200]}...")
-	# Clean input
+# Fixed header shared by every compact prompt; a stable prefix also lets providers reuse cached prompt tokens
+COMPACT_RULES_HEADER = "\n".join((
+    "Rules v2:",
+    "- Summarize each numbered text into ONE plain sentence, shorter than the text, essential information only.",
+    "- Paraphrase; no quoting, no preface, no subjects like 'User', 'They' or 'The comment'.",
+    '- Return ONLY a JSON array, one object per text, in order: [{"i":<number>,"s":"<summary>"}]',
+    "- Valid JSON: double quotes, escape inner quotes, no trailing commas, no code fences, no line breaks.",
+))
+
+
+def build_compact_prompt(batch: list[tuple[str, str]]) -> str:
+    """Compact prompt: items are numbered 1..n and the model answers with {"i","s"} objects.
+
+    Comment ids never reach the model; ``match_summaries`` maps indices back.
+    """
+    parts = [COMPACT_RULES_HEADER, "Texts:"]
+    for i, (_, text) in enumerate(batch, 1):
+        parts.append(f"[{i}] " + text.replace("\r", " ").replace("\n", " "))
+    parts.append(f"JSON array of {len(batch)} objects:")
+    return "\n".join(parts)
+
+
+def render_prompt(batch: List[Tuple[str, str]]) -> str:
+	if SUM_PROMPT_FORMAT == "legacy":
+		return build_prompt(batch)
+	return build_compact_prompt(batch)
+
+
+def parse_json_array(text: str) -> list:
+	"""Parse a model's JSON array answer, salvaging every well-formed object from malformed output.
+
+	Clean output takes the ``json.loads`` fast path; anything else goes through
+	one pass of ``JsonObjectScanner``. Objects that cannot be recovered come back
+	as ``UNRECOVERABLE`` placeholders so they keep their slot.
+	"""
 	text = (text or "").strip()
-	try:
-		result = json.loads(text)
-		print(f"✅ JSON DEBUG: Direct parse successful: {result}")
-		return result
-	except Exception as e:
-		print(f"❌ JSON DEBUG: Direct parse failed: {e}")
-	# Markdown code block
-	if "```json" in text:
-		print(f"🔍 JSON DEBUG: Found markdown code block")
-		start = text.find("```json") + 7
-		end = text.find("```", start)
-		if end != -1:
-			extracted = text[start:end].strip()
-			print(f"🔍 JSON DEBUG: Extracted from markdown: {extracted[:200]}...")
-			try:
-				result = json.loads(extracted)
-				print(f"✅ JSON DEBUG: Markdown extraction successful: {result}")
-				return result
-			except Exception as e2:
-				print(f"❌ JSON DEBUG: Markdown extraction failed: {e2}")
-	# Array extraction and fixups
 	start = text.find("[")
 	end = text.rfind("]")
-	if start != -1 and end != -1 and start < end:
-		json_text = text[start:end+1]
-		print(f"🔍 JSON DEBUG: Extracted JSON: {json_text[:200]}...")
+	for candidate in (text, text[start:end + 1] if 0 <= start < end else ""):
+		if not candidate:
+			continue
 		try:
-			result = json.loads(json_text)
-			print(f"✅ JSON DEBUG: Array extraction successful: {result}")
+			result = json.loads(candidate)
+		except ValueError:
+			continue
+		if isinstance(result, list):
 			return result
-		except Exception as e2:
-			print(f"❌ JSON DEBUG: Array extraction failed: {e2}")
-			# Try common fixes
-			fixed = _fix_json_syntax(json_text)
-			if fixed != json_text:
-				print("🔍 JSON DEBUG: Attempting to fix JSON syntax")
-				try:
-					result = json.loads(fixed)
-					print(f"✅ JSON DEBUG: Fixed JSON parse successful: {result}")
-					return result
-				except Exception as e3:
-					print(f"❌ JSON DEBUG: Fixed JSON parse failed: {e3}")
-	# Individual objects fallback
-	import re as _re
-	json_objects = _re.findall(r'\{[^{}]*\}', text)
-	if json_objects:
-		print(f"🔍 JSON DEBUG: Found {len(json_objects)} individual JSON objects")
+	scanner = JsonObjectScanner()
+	parsed = scanner.feed(text) + scanner.close()
+	print(f"🔍 JSON DEBUG: Salvaged {scanner.objects} objects ({scanner.repaired} repaired, {len(scanner.unrecoverable)} unrecoverable)")
+	if not parsed:
+		raise ValueError(f"Could not parse JSON from text: {text[:100]}...")
+	return parsed
+
+
+def _result_slot(obj, positions: Dict[str, int]) -> Optional[int]:
+	"""Batch position named by a result's ``i`` (compact, 1-based) or ``id`` (legacy), or None."""
+	if not isinstance(obj, dict):
+		return None
+	if "i" in obj:
 		try:
-			parsed_objects = [json.loads(obj_text) for obj_text in json_objects]
-			print(f"✅ JSON DEBUG: Individual objects parse successful: {parsed_objects}")
-			return parsed_objects
-		except Exception as e3:
-			print(f"❌ JSON DEBUG: Individual objects parse failed: {e3}")
-	print(f"❌ JSON DEBUG: All parsing attempts failed")
-	raise ValueError(f"Could not parse JSON from text: {text[:100]}...")
-
-
-def _fix_json_syntax(json_text: str) -> str:
-	import re
-	# Remove trailing commas
-	json_text = re.sub(r',\s*([}\]])', r'\1', json_text)
-	# Remove non-printable chars
-	json_text = ''.join(c for c in json_text if ord(c) >= 32 or c in '\n\r\t')
-	# Ensure brackets
-	if not json_text.strip().startswith('['):
-		json_text = '[' + json_text
-	if not json_text.strip().endswith(']'):
-		json_text = json_text + ']'
-	return json_text
+			idx = int(str(obj["i"]).strip()) - 1
+		except ValueError:
+			return None
+		return idx if 0 <= idx < len(positions) else None
+	cid = obj.get("id")
+	return positions.get(str(cid)) if cid is not None else None
+
+
+def count_positional_mismatches(parsed: list, batch: List[Tuple[str, str]]) -> int:
+	"""Items that cannot be matched reliably, plus missing or extra items.
+
+	Results only count when their ``i``/``id`` names no batch item or one that
+	was already answered (order does not matter).
+	"""
+	positions = {cid: i for i, (cid, _) in enumerate(batch)}
+	mismatched = abs(len(parsed) - len(batch))
+	seen = set()
+	for obj in parsed:
+		if not isinstance(obj, dict) or ("i" not in obj and not obj.get("id")):
+			continue
+		slot = _result_slot(obj, positions)
+		if slot is None or slot in seen:
+			mismatched += 1
+		seen.add(slot)
+	return mismatched
 
 
 def normalize_summary(summary: str) -> str:
@@ -201,22 +269,156 @@ def normalize_summary(summary: str) -> str:
 	return s
 
 
+def _summary_text(obj) -> str:
+	if isinstance(obj, dict):
+		return str(obj.get("s", obj.get("summary", ""))).strip()
+	return str(obj).strip()
+
+
+def _is_valid_summary(summary: str) -> bool:
+	return len(summary) >= 5 and summary.lower() != summary.upper()
+
+
+def match_summaries(parsed: list, batch: List[Tuple[str, str]], tag: str) -> Dict[str, Dict[str, str]]:
+	"""Map parsed results to batch items and validate each summary.
+
+	Results are placed by their ``i`` index or ``id``; results without a usable
+	one fill the remaining items by position.
+	"""
+	print(f"🔍 {tag} DEBUG: Matching {len(parsed)} results to {len(batch)} items")
+	positions = {cid: i for i, (cid, _) in enumerate(batch)}
+	assigned: Dict[int, object] = {}
+	unplaced = []
+	for pos, obj in enumerate(parsed):
+		slot = _result_slot(obj, positions)
+		if slot is None or slot in assigned:
+			unplaced.append((pos, obj))
+		else:
+			assigned[slot] = obj
+	for pos, obj in unplaced:
+		if pos < len(batch) and pos not in assigned:
+			assigned[pos] = obj
+	out: Dict[str, Dict[str, str]] = {}
+	for i, (cid, _) in enumerate(batch):
+		if i not in assigned:
+			out[cid] = {"ok": False, "error": "No summary generated"}
+			print(f"❌ {tag} FAILED: {cid} - no summary generated (item {i + 1} missing)")
+			continue
+		obj = assigned[i]
+		if isinstance(obj, dict) and UNRECOVERABLE in obj:
+			out[cid] = {"ok": False, "error": "Unrecoverable JSON"}
+			print(f"❌ {tag} FAILED: {cid} - unrecoverable JSON: {obj[UNRECOVERABLE][:80]}")
+			continue
+		summary = _summary_text(obj)
+		if _is_valid_summary(summary):
+			normalized = normalize_summary(summary)
+			out[cid] = {"ok": True, "summary": normalized}
+			print(f"✅ {tag} SUCCESS: {cid} -> '{normalized}'")
+		else:
+			out[cid] = {"ok": False, "error": "Empty or invalid summary"}
+			print(f"❌ {tag} REJECTED: {cid} - summary too short or invalid: '{summary}'")
+	if len(parsed) > len(assigned):
+		print(f"⚠️ {tag} WARNING: {len(parsed) - len(assigned)} extra summaries ignored")
+	return out
+
+
+def stream_summaries(summarizer, items: List[Tuple[str, str]], stats: Optional[Dict[str, int]] = None, job: str = "default"):
+	"""Summarize items, yielding {id: result} per completed batch.
+
+	Successful summaries are yielded as soon as their batch finishes. Failed
+	items from every batch go into one retry queue, which is re-batched and run
+	again after a backoff, up to SUM_RETRY_ROUNDS times. Failures are yielded
+	only once their retries are used up. If ``stats`` is given, ``items_sent``
+	(item-requests made), ``retried`` and ``retry_rounds`` are added to it.
+	``job`` (the analysis id) is the unit the backend scheduler shares fairly.
+	Streaming summarizers yield single summaries as soon as they arrive.
+	"""
+	texts = dict(items)
+	pending = list(items)
+	# Composite summarizers size batches from one of their backends' learned limits
+	tuning_key = getattr(summarizer, "tuning_key", (summarizer.backend, summarizer.model_name))
+	# Summarizers that stream report each summary through ``emit`` before their batch completes
+	streaming = getattr(summarizer, "streams_results", False)
+	delivered = set()
+	for round_no in range(SUM_RETRY_ROUNDS + 1):
+		if not pending:
+			return
+		final = round_no == SUM_RETRY_ROUNDS
+		if round_no:
+			delay = SUM_RETRY_BACKOFF_SECONDS * (2 ** (round_no - 1))
+			print(f"🔄 SUMMARY RETRY: Round {round_no}, re-batching {len(pending)} failed items after {delay:.1f}s")
+			time.sleep(delay)
+			if stats is not None:
+				stats["retried"] = stats.get("retried", 0) + len(pending)
+				stats["retry_rounds"] = stats.get("retry_rounds", 0) + 1
+		if stats is not None:
+			stats["items_sent"] = stats.get("items_sent", 0) + len(pending)
+		if SUM_ADAPTIVE_BATCHING:
+			batches = batch_tuner.batches(pending, *tuning_key)
+		else:
+			batches = chunk_batches(pending)
+		retry = round_no > 0
+		failed: List[Tuple[str, str]] = []
+		if streaming:
+			fn = lambda b, emit: summarizer._process_one_batch_async(b, retry=retry, job=job, emit=emit)
+		else:
+			fn = lambda b: summarizer._process_one_batch_async(b, retry=retry, job=job)
+		for batch_result in get_engine().map_stream(summarizer.backend, batches, fn, emits=streaming):
+			# Summaries emitted while a batch streamed come back again in its final result
+			batch_result = {cid: out for cid, out in batch_result.items() if cid not in delivered}
+			delivered.update(cid for cid, out in batch_result.items() if out.get("ok"))
+			if final:
+				if batch_result:
+					yield batch_result
+				continue
+			ok = {cid: out for cid, out in batch_result.items() if out.get("ok")}
+			failed.extend((cid, texts[cid]) for cid, out in batch_result.items() if not out.get("ok"))
+			if ok:
+				yield ok
+		pending = failed
+
+
+def batch_tokens(batch: List[Tuple[str, str]]) -> int:
+	"""Estimated tokens one batch request costs against a tokens/min budget."""
+	return sum(estimate_tokens(text) for _, text in batch)
+
+
+def _is_gemini_rate_limit(e: Exception) -> bool:
+	text = str(e)
+	return getattr(e, "code", None) == 429 or type(e).__name__ in ("ResourceExhausted", "TooManyRequests") or "429" in text or "RESOURCE_EXHAUSTED" in text
+
+
+def _gemini_retry_after(e: Exception) -> Optional[float]:
+	"""Suggested delay from a Gemini quota error ("retry in 17.2s" or a RetryInfo retry_delay)."""
+	m = re.search(r"retry in ([\d.]+)\s*s", str(e), re.I) or re.search(r"retry_delay\s*\{\s*seconds:\s*(\d+)", str(e))
+	return float(m.group(1)) if m else None
+
+
 class GeminiSummarizer:
+	backend = "gemini"
+
 	def __init__(self) -> None:
 		api_key = os.getenv("GEMINI_API_KEY")
 		if not api_key:
 			raise RuntimeError("GEMINI_API_KEY not set")
 		genai.configure(api_key=api_key)
-		self.model = genai.GenerativeModel(self._resolve_model_name(GEMINI_MODEL))
+		self.model_name = self._resolve_model_name(GEMINI_MODEL)
+		self.model = genai.GenerativeModel(self.model_name)
+
+	@staticmethod
+	def _list_models(refresh: bool = False) -> List[Tuple[str, List[str]]]:
+		"""(name, generation methods) of every model, cached for SUM_MODEL_CACHE_TTL_SECONDS."""
+		return cached_model_listing("gemini", lambda: [
+			(getattr(m, "name", str(m)), list(getattr(m, "supported_generation_methods", None) or []))
+			for m in genai.list_models()
+		], refresh=refresh)
 
 	def _resolve_model_name(self, configured: str) -> str:
 		"""Enforce exact Gemini Flash model only. No auto-fallbacks."""
 		try:
-			available = list(genai.list_models())
-			available_names = [getattr(m, "name", str(m)) for m in available]
-			for m in available:
-				name = getattr(m, "name", "")
-				methods = getattr(m, "supported_generation_methods", None) or []
+			available = self._list_models()
+			available_names = [name for name, _ in available]
+			for name, methods in available:
 				if name == configured and ("generateContent" in methods or "generate_content" in methods):
 					print(f"🔍 GEMINI DEBUG: Using configured model '{configured}'")
 					return configured
@@ -226,101 +428,56 @@ class GeminiSummarizer:
 			# If listing fails, use configured and let API enforce correctness
 			return configured
 
-	def summarize_in_batches(self, items: List[Tuple[str, str]]) -> Dict[str, Dict[str, str]]:
+	def check(self) -> None:
+		"""Health check: the API answers and still lists the configured model (bypasses the listing cache)."""
+		names = [name for name, _ in self._list_models(refresh=True)]
+		if names and self.model_name not in names:
+			raise RuntimeError(f"Gemini model {self.model_name} is no longer listed")
+
+	def summarize_in_batches(self, items: List[Tuple[str, str]], stats: Optional[Dict[str, int]] = None, job: str = "default") -> Dict[str, Dict[str, str]]:
 		results: Dict[str, Dict[str, str]] = {cid: {"ok": False} for cid, _ in items}
-		batches = chunk_batches(items)
-		if not batches:
-			return results
-		with ThreadPoolExecutor(max_workers=max(1, SUM_CONCURRENCY)) as ex:
-			futures = {ex.submit(self._process_one_batch, batch): batch for batch in batches}
-			for fut in as_completed(futures):
-				batch_result = fut.result()
-				for cid, payload in batch_result.items():
-					results[cid] = payload
-		# mark any still false
-		for cid in list(results.keys()):
-			if not results[cid].get("ok"):
-				results[cid] = {"ok": False}
+		for batch_result in self.summarize_in_batches_stream(items, stats, job):
+			for cid, payload in batch_result.items():
+				results[cid] = payload
 		return results
 
-	def summarize_in_batches_stream(self, items: List[Tuple[str, str]]):
-		"""Yield results per completed batch for progressive updates."""
-		batches = chunk_batches(items)
-		if not batches:
-			return
-		with ThreadPoolExecutor(max_workers=max(1, SUM_CONCURRENCY)) as ex:
-			futures = {ex.submit(self._process_one_batch, batch): batch for batch in batches}
-			for fut in as_completed(futures):
-				batch_result = fut.result()
-				yield batch_result
+	def summarize_in_batches_stream(self, items: List[Tuple[str, str]], stats: Optional[Dict[str, int]] = None, job: str = "default"):
+		"""Yield results per completed batch for progressive updates (see ``stream_summaries``)."""
+		yield from stream_summaries(self, items, stats, job)
 
 	def _process_one_batch(self, batch: List[Tuple[str, str]]) -> Dict[str, Dict[str, str]]:
+		return get_engine().run(self._process_one_batch_async(batch))
+
+	async def _generate_async(self, prompt: str):
+		try:
+			generate = getattr(self.model, "generate_content_async", None)
+			if generate is not None:
+				return await generate(prompt)
+			# Client without a native async call: keep the loop free by running it in a thread
+			return await asyncio.to_thread(self.model.generate_content, prompt)
+		except Exception as e:
+			if _is_gemini_rate_limit(e):
+				raise RateLimited(_gemini_retry_after(e), str(e)) from e
+			raise
+
+	async def _process_one_batch_async(self, batch: List[Tuple[str, str]], retry: bool = False, job: str = "default") -> Dict[str, Dict[str, str]]:
+		"""Summarize a batch with one request; failed items are retried by ``stream_summaries``."""
 		print(f"🔍 GEMINI DEBUG: Processing batch with {len(batch)} items")
-		out: Dict[str, Dict[str, str]] = {cid: {"ok": False} for cid, _ in batch}
-		remaining_items = list(batch)
-		max_attempts = 3
-		for attempt in range(max_attempts):
-			if not remaining_items:
-				break
-			print(f"🔍 GEMINI DEBUG: Attempt {attempt + 1} with {len(remaining_items)} remaining items")
-			try:
-				prompt = build_prompt(remaining_items)
-				resp = self.model.generate_content(prompt)
-				text = (getattr(resp, "text", "") or "").strip()
-				print(f"🔍 GEMINI DEBUG: Response length: {len(text)}")
-				parsed = parse_json_array(text)
-				# Process results and identify successful vs failed items (positional mapping for consistency)
-				successful_items: List[Tuple[str, str]] = []
-				failed_items: List[Tuple[str, str]] = []
-				print(f"🔍 GEMINI DEBUG: Matching {len(parsed)} results to {len(remaining_items)} remaining items")
-				for i, obj in enumerate(parsed):
-					if i < len(remaining_items):
-						cid, text_in = remaining_items[i]
-						if isinstance(obj, dict):
-							summary = str(obj.get("summary", "")).strip()
-						elif isinstance(obj, str):
-							summary = obj.strip()
-						else:
-							summary = str(obj).strip()
-						if len(summary) >= 5 and summary.lower() != summary.upper():
-							normalized = normalize_summary(summary)
-							out[cid] = {"ok": True, "summary": normalized}
-							successful_items.append((cid, text_in))
-							print(f"✅ GEMINI SUCCESS: {cid} -> '{normalized}'")
-						else:
-							failed_items.append((cid, text_in))
-							out[cid] = {"ok": False, "error": "Empty or invalid summary"}
-							print(f"❌ GEMINI REJECTED: {cid} - summary too short or invalid: '{summary}'")
-					else:
-						print(f"⚠️ GEMINI WARNING: Extra summary at position {i}, ignoring")
-				# Mark any remaining items (not processed) as failed
-				for i in range(len(parsed), len(remaining_items)):
-					cid, text_in = remaining_items[i]
-					failed_items.append((cid, text_in))
-					out[cid] = {"ok": False, "error": "No summary generated"}
-					print(f"❌ GEMINI FAILED: {cid} - no summary generated (position {i} not processed)")
-				attempt_success_rate = len(successful_items) / len(remaining_items) if remaining_items else 0
-				print(f"🔍 GEMINI DEBUG: Attempt {attempt + 1} success rate: {len(successful_items)}/{len(remaining_items)} ({attempt_success_rate:.1%})")
-				if attempt_success_rate >= 0.9:
-					print(f"✅ GEMINI BATCH COMPLETE: Success rate {attempt_success_rate:.1%} >= 90%, batch complete")
-					break
-				if failed_items:
-					print(f"🔄 GEMINI AUTO-RETRY: Success rate {attempt_success_rate:.1%} < 90%, retrying {len(failed_items)} failed items")
-					remaining_items = failed_items
-				else:
-					break
-			except Exception as e:
-				print(f"❌ GEMINI ERROR in attempt {attempt + 1}: {e}")
-				if attempt == max_attempts - 1:
-					for cid, _ in remaining_items:
-						out[cid] = {"ok": False, "error": f"{str(e)}"}
-					break
-				time.sleep(2 ** attempt)
-		# Mark any remaining not-ok as failed
-		for cid, _ in remaining_items:
-			if cid not in out or not out[cid].get("ok"):
-				out[cid] = {"ok": False, "error": out.get(cid, {}).get("error", "Failed after all retry attempts")}
-		print(f"🔍 GEMINI DEBUG: Final batch result: {out}")
+		started = time.perf_counter()
+		try:
+			prompt = render_prompt(batch)
+			resp = await get_engine().submit(self.backend, job, batch_tokens(batch), lambda: self._generate_async(prompt))
+			text = (getattr(resp, "text", "") or "").strip()
+			print(f"🔍 GEMINI DEBUG: Response length: {len(text)}")
+			parsed = parse_json_array(text)
+		except Exception as e:
+			print(f"❌ GEMINI ERROR: {e}")
+			batch_tuner.record(self.backend, self.model_name, batch, time.perf_counter() - started, error=True, retry=retry)
+			return {cid: {"ok": False, "error": str(e)} for cid, _ in batch}
+		out = match_summaries(parsed, batch, "GEMINI")
+		failed = sum(1 for r in out.values() if not r.get("ok"))
+		batch_tuner.record(self.backend, self.model_name, batch, time.perf_counter() - started, failed=failed, mismatched=count_positional_mismatches(parsed, batch), retry=retry)
+		print(f"🔍 GEMINI DEBUG: Batch success: {len(batch) - failed}/{len(batch)}")
 		return out
 
 
@@ -329,22 +486,26 @@ class GeminiSummarizer:
 
 
 class OllamaSummarizer:
-	def __init__(self, model_name: str = "gemma3:1b") -> None:
+	backend = "ollama"
+	streams_results = OLLAMA_STREAM
+
+	def __init__(self, model_name: str = OLLAMA_MODEL) -> None:
 		self.model_name = model_name
 		self.ollama_url = os.getenv("OLLAMA_URL", "http://localhost:11434")
 		self._test_connection()
 
-	def _test_connection(self) -> None:
-		"""Test if Ollama is running and model is available."""
+	def _list_models(self) -> List[str]:
+		print(f"🔍 OLLAMA DEBUG: Testing connection to {self.ollama_url}")
+		response = requests.get(f"{self.ollama_url}/api/tags", timeout=OLLAMA_CONNECT_TIMEOUT)
+		print(f"🔍 OLLAMA DEBUG: Connection test response: {response.status_code}")
+		if response.status_code != 200:
+			raise RuntimeError(f"Ollama not responding: {response.status_code}")
+		return [model.get("name", "") for model in response.json().get("models", [])]
+
+	def _test_connection(self, refresh: bool = False) -> None:
+		"""Test if Ollama is running and model is available (listing cached for SUM_MODEL_CACHE_TTL_SECONDS)."""
 		try:
-			print(f"🔍 OLLAMA DEBUG: Testing connection to {self.ollama_url}")
-			response = requests.get(f"{self.ollama_url}/api/tags", timeout=500)
-			print(f"🔍 OLLAMA DEBUG: Connection test response: {response.status_code}")
-			if response.status_code != 200:
-				raise RuntimeError(f"Ollama not responding: {response.status_code}")
-			
-			models = response.json().get("models", [])
-			model_names = [model.get("name", "") for model in models]
+			model_names = cached_model_listing(f"ollama:{self.ollama_url}", self._list_models, refresh=refresh)
 			print(f"🔍 OLLAMA DEBUG: Available models: {model_names}")
 			if self.model_name not in model_names:
 				raise RuntimeError(f"Model {self.model_name} not found. Available models: {model_names}")
@@ -353,170 +514,147 @@ class OllamaSummarizer:
 			print(f"❌ OLLAMA ERROR: Connection failed: {e}")
 			raise RuntimeError(f"Cannot connect to Ollama at {self.ollama_url}: {e}")
 
-	def summarize_in_batches(self, items: List[Tuple[str, str]]) -> Dict[str, Dict[str, str]]:
+	def check(self) -> None:
+		"""Health check: Ollama answers and still has the model."""
+		self._test_connection(refresh=True)
+
+	def warm(self) -> None:
+		"""Load the model into Ollama's memory ahead of the first batch."""
+		response = requests.post(
+			f"{self.ollama_url}/api/generate",
+			json={"model": self.model_name, "keep_alive": OLLAMA_KEEP_ALIVE},
+			timeout=OLLAMA_CONNECT_TIMEOUT + 120,
+		)
+		if response.status_code != 200:
+			raise RuntimeError(f"Ollama could not load {self.model_name}: {response.status_code}")
+
+	def summarize_in_batches(self, items: List[Tuple[str, str]], stats: Optional[Dict[str, int]] = None, job: str = "default") -> Dict[str, Dict[str, str]]:
 		results: Dict[str, Dict[str, str]] = {cid: {"ok": False} for cid, _ in items}
-		batches = chunk_batches(items)
-		if not batches:
-			return results
-		with ThreadPoolExecutor(max_workers=max(1, SUM_CONCURRENCY)) as ex:
-			futures = {ex.submit(self._process_one_batch, batch): batch for batch in batches}
-			for fut in as_completed(futures):
-				batch_result = fut.result()
-				for cid, payload in batch_result.items():
-					results[cid] = payload
-		# mark any still false
-		for cid in list(results.keys()):
-			if not results[cid].get("ok"):
-				results[cid] = {"ok": False}
+		for batch_result in self.summarize_in_batches_stream(items, stats, job):
+			for cid, payload in batch_result.items():
+				results[cid] = payload
 		return results
 
-	def summarize_in_batches_stream(self, items: List[Tuple[str, str]]):
-		"""Yield results per completed batch for progressive updates."""
-		batches = chunk_batches(items)
-		if not batches:
-			return
-		with ThreadPoolExecutor(max_workers=max(1, SUM_CONCURRENCY)) as ex:
-			futures = {ex.submit(self._process_one_batch, batch): batch for batch in batches}
-			for fut in as_completed(futures):
-				batch_result = fut.result()
-				yield batch_result
+	def summarize_in_batches_stream(self, items: List[Tuple[str, str]], stats: Optional[Dict[str, int]] = None, job: str = "default"):
+		"""Yield results per completed batch for progressive updates (see ``stream_summaries``)."""
+		yield from stream_summaries(self, items, stats, job)
 
 	def _process_one_batch(self, batch: List[Tuple[str, str]]) -> Dict[str, Dict[str, str]]:
-		print(f"🔍 OLLAMA DEBUG: Processing batch with {len(batch)} items")
-		out: Dict[str, Dict[str, str]] = {cid: {"ok": False} for cid, _ in batch}
+		return get_engine().run(self._process_one_batch_async(batch))
+
+
+	def _payload(self, prompt: str, stream: bool) -> Dict[str, Any]:
+		return {
+			"model": self.model_name,
+			"prompt": prompt,
+			"stream": stream,
+			# Keep the model resident between batches and analyses
+			"keep_alive": OLLAMA_KEEP_ALIVE,
+			"options": {
+				"temperature": 0.3,
+				"top_p": 0.9,
+				"max_tokens": 2000
+			}
+		}
+
+	async def _generate(self, prompt: str, batch: List[Tuple[str, str]], job: str) -> list:
+		async def _post():
+			# Pooled keep-alive client shared by all concurrent batches
+			response = await get_engine().http_client().post(f"{self.ollama_url}/api/generate", json=self._payload(prompt, False), timeout=60)
+			if response.status_code in (429, 503):
+				raise RateLimited(parse_retry_after(response.headers.get("Retry-After")), f"Ollama API error: {response.status_code}")
+			return response
+
+		response = await get_engine().submit(self.backend, job, batch_tokens(batch), _post)
+		print(f"🔍 OLLAMA DEBUG: Response status: {response.status_code}")
 		
-		# Process the batch with immediate retry logic
-		remaining_items = list(batch)  # Items that still need processing
-		max_attempts = 3
+		if response.status_code != 200:
+			print(f"❌ OLLAMA ERROR: {response.status_code} - {response.text}")
+			raise ValueError(f"Ollama API error: {response.status_code} - {response.text}")
 		
-		for attempt in range(max_attempts):
-			if not remaining_items:
-				break
-				
-			print(f"🔍 OLLAMA DEBUG: Attempt {attempt + 1} with {len(remaining_items)} remaining items")
-			
-			try:
-				prompt = build_prompt(remaining_items)
-				print(f"🔍 OLLAMA DEBUG: Sending prompt to {self.model_name}")
-				print(f"🔍 OLLAMA DEBUG: Prompt preview: {prompt[:300]}...")
-				
-				response = requests.post(
-					f"{self.ollama_url}/api/generate",
-					json={
-						"model": self.model_name,
-						"prompt": prompt,
-						"stream": False,
-						"options": {
-							"temperature": 0.3,
-							"top_p": 0.9,
-							"max_tokens": 2000
-						}
-					},
-					timeout=60
-				)
-				print(f"🔍 OLLAMA DEBUG: Response status: {response.status_code}")
-				
-				if response.status_code != 200:
-					print(f"❌ OLLAMA ERROR: {response.status_code} - {response.text}")
-					raise ValueError(f"Ollama API error: {response.status_code} - {response.text}")
-				
-				result = response.json()
-				text = result.get("response", "").strip()
-				print(f"🔍 OLLAMA DEBUG: Raw response from Gemma3:")
-				print(f"📝 {text}")
-				print(f"🔍 OLLAMA DEBUG: Response length: {len(text)}")
-				
-				parsed = parse_json_array(text)
-				print(f"🔍 OLLAMA DEBUG: Parsed JSON: {parsed}")
-				
-				# Process results and identify successful vs failed items
-				successful_items = []
-				failed_items = []
-				
-				# CRITICAL: Match parsed results to remaining items by position to prevent mismatch
-				print(f"🔍 OLLAMA DEBUG: Matching {len(parsed)} results to {len(remaining_items)} remaining items")
-				for i, obj in enumerate(parsed):
-					if i < len(remaining_items):
-						cid, text = remaining_items[i]
-						
-						# Handle both dict and string objects
-						if isinstance(obj, dict):
-							summary = str(obj.get("summary", "")).strip()
-						elif isinstance(obj, str):
-							summary = obj.strip()
-						else:
-							summary = str(obj).strip()
-							
-						print(f"🔍 OLLAMA DEBUG: Position {i}: Comment {cid} -> Summary: '{summary}'")
-						
-						if len(summary) >= 5 and summary.lower() != summary.upper():
-							# Success - normalize and store with EXACT comment ID
-							normalized = normalize_summary(summary)
-							out[cid] = {"ok": True, "summary": normalized}
-							successful_items.append((cid, text))
-							print(f"✅ OLLAMA SUCCESS: {cid} -> '{normalized}'")
-						else:
-							# Failed - will retry with EXACT comment ID
-							failed_items.append((cid, text))
-							print(f"❌ OLLAMA REJECTED: {cid} - summary too short or invalid: '{summary}'")
-					else:
-						print(f"⚠️ OLLAMA WARNING: Extra summary at position {i}, ignoring")
-				
-				# Mark any remaining items (not processed) as failed with EXACT comment IDs
-				for i in range(len(parsed), len(remaining_items)):
-					cid, text = remaining_items[i]
-					failed_items.append((cid, text))
-					print(f"❌ OLLAMA FAILED: {cid} - no summary generated (position {i} not processed)")
-				
-				# Calculate success rate for this attempt
-				attempt_success_rate = len(successful_items) / len(remaining_items) if remaining_items else 0
-				print(f"🔍 OLLAMA DEBUG: Attempt {attempt + 1} success rate: {len(successful_items)}/{len(remaining_items)} ({attempt_success_rate:.1%})")
-				
-				# If success rate is >= 90%, we're done with this batch
-				if attempt_success_rate >= 0.9:
-					print(f"✅ OLLAMA BATCH COMPLETE: Success rate {attempt_success_rate:.1%} >= 90%, batch complete")
-					break
-				
-				# If success rate < 90%, retry only the failed items
-				if failed_items:
-					print(f"🔄 OLLAMA AUTO-RETRY: Success rate {attempt_success_rate:.1%} < 90%, retrying {len(failed_items)} failed items")
-					remaining_items = failed_items
-				else:
-					# No failed items, we're done
-					break
-					
-			except Exception as e:
-				print(f"❌ OLLAMA ERROR in attempt {attempt + 1}: {e}")
-				if attempt == max_attempts - 1:
-					# Final attempt failed, mark all remaining as error
-					for cid, _ in remaining_items:
-						out[cid] = {"ok": False, "error": f"Failed after {max_attempts} attempts: {str(e)}"}
-					break
-				time.sleep(2 ** attempt)
-		
-		# Mark any remaining items as failed
-		for cid, _ in remaining_items:
-			if cid not in out or not out[cid].get("ok"):
-				out[cid] = {"ok": False, "error": "Failed after all retry attempts"}
+		result = response.json()
+		text = result.get("response", "").strip()
+		print(f"🔍 OLLAMA DEBUG: Raw response from Gemma3:")
+		print(f"📝 {text}")
+		print(f"🔍 OLLAMA DEBUG: Response length: {len(text)}")
 		
-		# Final success rate check and validation
-		success_count = sum(1 for result in out.values() if result.get("ok"))
-		total_count = len(out)
-		final_success_rate = success_count / total_count if total_count > 0 else 0
-		
-		print(f"🔍 OLLAMA DEBUG: Final batch success rate: {success_count}/{total_count} ({final_success_rate:.1%})")
-		
-		# CRITICAL: Validate that all summaries are properly matched to their comment IDs
-		print(f"🔍 OLLAMA DEBUG: Final batch validation:")
-		for cid, result in out.items():
-			if result.get("ok"):
-				summary = result.get("summary", "")
-				print(f"  ✅ {cid} -> '{summary}'")
+		parsed = parse_json_array(text)
+		print(f"🔍 OLLAMA DEBUG: Parsed JSON: {parsed}")
+		return parsed
+
+	async def _generate_streaming(self, prompt: str, batch: List[Tuple[str, str]], job: str, emit: Optional[Callable[[Dict[str, Dict[str, str]]], None]]) -> list:
+		"""Stream the completion through ``JsonObjectScanner``, emitting each summary as soon as its object closes.
+
+		Objects received before a timeout or disconnect are kept; the rest of the
+		batch comes back missing and goes to the retry queue.
+		"""
+		positions = {cid: i for i, (cid, _) in enumerate(batch)}
+		scanner = JsonObjectScanner()
+		parsed: list = []
+
+		def _take(objs: list) -> None:
+			for obj in objs:
+				parsed.append(obj)
+				slot = _result_slot(obj, positions)
+				if emit is None or slot is None or UNRECOVERABLE in obj:
+					continue
+				summary = _summary_text(obj)
+				if _is_valid_summary(summary):
+					cid = batch[slot][0]
+					emit({cid: {"ok": True, "summary": normalize_summary(summary)}})
+
+		async def _stream() -> None:
+			async with get_engine().http_client().stream("POST", f"{self.ollama_url}/api/generate", json=self._payload(prompt, True), timeout=60) as response:
+				if response.status_code in (429, 503):
+					raise RateLimited(parse_retry_after(response.headers.get("Retry-After")), f"Ollama API error: {response.status_code}")
+				if response.status_code != 200:
+					body = (await response.aread()).decode("utf-8", "replace")
+					raise ValueError(f"Ollama API error: {response.status_code} - {body}")
+				async for line in response.aiter_lines():
+					if not line.strip():
+						continue
+					chunk = json.loads(line)
+					if chunk.get("error"):
+						raise ValueError(f"Ollama API error: {chunk['error']}")
+					_take(scanner.feed(chunk.get("response", "")))
+					if chunk.get("done"):
+						break
+
+		try:
+			await get_engine().submit(self.backend, job, batch_tokens(batch), lambda: asyncio.wait_for(_stream(), OLLAMA_STREAM_TIMEOUT))
+		except (httpx.HTTPError, asyncio.TimeoutError, ValueError) as e:
+			if not parsed:
+				raise
+			print(f"⚠️ OLLAMA STREAM: stopped after {len(parsed)}/{len(batch)} results ({type(e).__name__}{': ' + str(e) if str(e) else ''}), keeping them")
+		_take(scanner.close())
+		print(f"🔍 OLLAMA DEBUG: Streamed {len(parsed)} results ({scanner.repaired} repaired, {len(scanner.unrecoverable)} unrecoverable)")
+		if not parsed:
+			raise ValueError("Could not parse JSON from streamed response")
+		return parsed
+
+	async def _process_one_batch_async(self, batch: List[Tuple[str, str]], retry: bool = False, job: str = "default", emit: Optional[Callable[[Dict[str, Dict[str, str]]], None]] = None) -> Dict[str, Dict[str, str]]:
+		"""Summarize a batch with one request; failed items are retried by ``stream_summaries``.
+
+		When streaming, ``emit`` receives each summary as soon as it arrives.
+		"""
+		print(f"🔍 OLLAMA DEBUG: Processing batch with {len(batch)} items")
+		started = time.perf_counter()
+		try:
+			prompt = render_prompt(batch)
+			print(f"🔍 OLLAMA DEBUG: Sending prompt to {self.model_name}")
+			print(f"🔍 OLLAMA DEBUG: Prompt preview: {prompt[:300]}...")
+			if OLLAMA_STREAM:
+				parsed = await self._generate_streaming(prompt, batch, job, emit)
 			else:
-				error = result.get("error", "Unknown error")
-				print(f"  ❌ {cid} -> ERROR: {error}")
+				parsed = await self._generate(prompt, batch, job)
+		except Exception as e:
+			print(f"❌ OLLAMA ERROR: {e}")
+			batch_tuner.record(self.backend, self.model_name, batch, time.perf_counter() - started, error=True, retry=retry)
+			return {cid: {"ok": False, "error": str(e)} for cid, _ in batch}
 		
-		print(f"🔍 OLLAMA DEBUG: Final batch result: {out}")
+		# CRITICAL: Match parsed results back to the exact comment IDs of this batch
+		out = match_summaries(parsed, batch, "OLLAMA")
+		failed = sum(1 for r in out.values() if not r.get("ok"))
+		batch_tuner.record(self.backend, self.model_name, batch, time.perf_counter() - started, failed=failed, mismatched=count_positional_mismatches(parsed, batch), retry=retry)
+		print(f"🔍 OLLAMA DEBUG: Batch success: {len(batch) - failed}/{len(batch)}")
 		return out
-
-
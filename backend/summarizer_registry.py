@@ -0,0 +1,172 @@
+import os
+import time
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from .summarizer import clear_model_listings
+
+# Background health checks of built summarizers (0 = off)
+SUM_HEALTH_CHECK_SECONDS = float(os.getenv("SUM_HEALTH_CHECK_SECONDS", "60"))
+# Summarizer backends built (and warmed) in the background at startup
+SUMMARIZER_PRELOAD = [b.strip() for b in os.getenv("SUMMARIZER_PRELOAD", "gemini,ollama").split(",") if b.strip()]
+
+
+class _Entry:
+	def __init__(self) -> None:
+		self.instance: Optional[Any] = None
+		self.error: Optional[str] = None
+		self.healthy: Optional[bool] = None
+		self.checked_at: Optional[str] = None
+		self.built_seconds: Optional[float] = None
+		# pending | warming | ready | failed; warm-up runs outside ``lock``
+		self.warm_state: Optional[str] = None
+		self.lock = threading.Lock()
+
+
+class SummarizerRegistry:
+	"""Build each summarizer backend once and hand out the shared, warm instance.
+
+	Backends are built on first use (or by ``start`` in the background); model
+	listings behind construction are cached by the summarizers themselves. A
+	background thread re-checks built backends every SUM_HEALTH_CHECK_SECONDS
+	and retries preloaded ones that failed to build.
+	"""
+
+	def __init__(self, factories: Dict[str, Callable[[], Any]]) -> None:
+		self._factories = factories
+		self._entries: Dict[str, _Entry] = {name: _Entry() for name in factories}
+		self._stop = threading.Event()
+		self._thread: Optional[threading.Thread] = None
+		self._preload: Iterable[str] = ()
+
+	def _entry(self, backend: str) -> _Entry:
+		entry = self._entries.get(backend)
+		if entry is None:
+			raise ValueError(f"Unknown summarizer backend: {backend}")
+		return entry
+
+	def get(self, backend: str) -> Any:
+		"""Shared instance of ``backend``, building it if needed; raises RuntimeError if it cannot be built.
+
+		The caller that builds an instance also warms it up, without holding the
+		entry lock, so other callers get the instance straight away.
+		"""
+		entry = self._entry(backend)
+		with entry.lock:
+			if entry.instance is None:
+				t0 = time.perf_counter()
+				try:
+					entry.instance = self._factories[backend]()
+				except Exception as e:
+					entry.error = str(e)
+					entry.healthy = False
+					raise RuntimeError(f"{backend} summarizer not available: {e}") from e
+				entry.built_seconds = round(time.perf_counter() - t0, 2)
+				entry.error = None
+				entry.healthy = True
+				entry.checked_at = datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+				print(f"✅ Summarizer {backend} ready in {entry.built_seconds:.2f}s")
+				entry.warm_state = "pending"
+			instance = entry.instance
+			warm_now = entry.warm_state == "pending"
+			if warm_now:
+				entry.warm_state = "warming"
+		if warm_now:
+			self._warm(backend, entry, instance)
+		return instance
+
+	def _warm(self, backend: str, entry: _Entry, instance: Any) -> None:
+		warm = getattr(instance, "warm", None)
+		state = "ready"
+		if warm is not None:
+			try:
+				warm()
+			except Exception as e:
+				state = "failed"
+				print(f"⚠️ Summarizer {backend} warm-up failed: {e}")
+		with entry.lock:
+			# The instance may have been invalidated while it warmed up
+			if entry.instance is instance:
+				entry.warm_state = state
+
+	def peek(self, backend: str) -> Optional[Any]:
+		"""The instance if already built, without building it."""
+		return self._entry(backend).instance
+
+	def error(self, backend: str) -> Optional[str]:
+		return self._entry(backend).error
+
+	def invalidate(self, backend: Optional[str] = None) -> None:
+		"""Drop built instances (and their cached model listings) so the next ``get`` rebuilds."""
+		for name in [backend] if backend else list(self._entries):
+			entry = self._entry(name)
+			with entry.lock:
+				entry.instance = None
+				entry.error = None
+				entry.healthy = None
+				entry.warm_state = None
+			clear_model_listings(name)
+
+	def check(self, backend: str) -> None:
+		"""Probe a built backend live (summarizers' ``check`` bypasses the model listing cache)."""
+		entry = self._entry(backend)
+		instance = entry.instance
+		if instance is None:
+			return
+		was_healthy = entry.healthy
+		try:
+			check = getattr(instance, "check", None)
+			if check is not None:
+				check()
+			entry.healthy = True
+			entry.error = None
+		except Exception as e:
+			entry.healthy = False
+			entry.error = str(e)
+		entry.checked_at = datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+		if entry.healthy != was_healthy:
+			print(f"{'✅' if entry.healthy else '❌'} Summarizer {backend} health: {'ok' if entry.healthy else entry.error}")
+
+	def start(self, preload: Iterable[str] = SUMMARIZER_PRELOAD) -> None:
+		"""Build ``preload`` backends and run health checks on a background thread."""
+		self._preload = [b for b in preload if b in self._entries]
+		self._stop.clear()
+		self._thread = threading.Thread(target=self._run, name="summarizer-health", daemon=True)
+		self._thread.start()
+
+	def _run(self) -> None:
+		while not self._stop.is_set():
+			for backend in self._preload:
+				if self.peek(backend) is None:
+					previous = self.error(backend)
+					try:
+						self.get(backend)
+					except Exception:
+						# Only report a backend that stays down once per distinct error
+						if self.error(backend) != previous:
+							print(f"⚠️ Summarizer {backend} preload failed: {self.error(backend)}")
+			for backend in self._entries:
+				self.check(backend)
+			if SUM_HEALTH_CHECK_SECONDS <= 0 or self._stop.wait(SUM_HEALTH_CHECK_SECONDS):
+				return
+
+	def close(self) -> None:
+		self._stop.set()
+		if self._thread is not None:
+			self._thread.join(timeout=5)
+			self._thread = None
+
+	def status(self) -> Dict[str, Dict[str, Any]]:
+		return {
+			name: {
+				"ready": entry.instance is not None,
+				"model_name": getattr(entry.instance, "model_name", None),
+				"healthy": entry.healthy,
+				"warm": entry.warm_state,
+				"error": entry.error,
+				"checked_at": entry.checked_at,
+				"built_seconds": entry.built_seconds,
+			}
+			for name, entry in self._entries.items()
+		}
@@ -1,10 +1,20 @@
-import io
+import os
 import json
 import re
-from typing import List, Dict, Any
+import codecs
+import hashlib
+from pathlib import Path
+from typing import List, Dict, Any, BinaryIO, Iterable, Iterator, Tuple
 
 from fastapi import UploadFile, HTTPException
 
+# Bytes read from an upload per chunk, and comments inserted per DB batch
+INGEST_CHUNK_BYTES = int(os.getenv("INGEST_CHUNK_BYTES", str(1024 * 1024)))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "500"))
+# Upper bound for a single JSON array element still being buffered
+MAX_JSON_ELEMENT_CHARS = int(os.getenv("MAX_JSON_ELEMENT_CHARS", str(16 * 1024 * 1024)))
+_SCALAR_END_RE = re.compile(r"[\s,\]]")
+
 
 def clean_text(text: str) -> str:
 	t = text.strip()
@@ -12,63 +22,165 @@ def clean_text(text: str) -> str:
 	return t
 
 
-async def parse_files_to_comments(files: List[UploadFile]) -> List[Dict[str, Any]]:
-	items: List[Dict[str, Any]] = []
-	for f in files:
-		content = await f.read()
-		name = f.filename or "uploaded"
-		text = content.decode("utf-8", errors="ignore")
+def iter_text_chunks(fileobj: BinaryIO, chunk_size: int = INGEST_CHUNK_BYTES) -> Iterator[str]:
+	"""Read a binary file in fixed-size chunks and decode them incrementally as UTF-8."""
+	decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="ignore")
+	while True:
+		block = fileobj.read(chunk_size)
+		if not block:
+			break
+		text = decoder.decode(block)
+		if text:
+			yield text
+	tail = decoder.decode(b"", final=True)
+	if tail:
+		yield tail
+
+
+def iter_lines(chunks: Iterable[str]) -> Iterator[str]:
+	"""Re-split decoded chunks into lines (line endings kept) without buffering the whole text."""
+	buf = ""
+	for chunk in chunks:
+		buf += chunk
+		start = 0
+		while True:
+			nl = buf.find("\n", start)
+			if nl == -1:
+				break
+			yield buf[start:nl + 1]
+			start = nl + 1
+		buf = buf[start:]
+	if buf:
+		yield buf
+
+
+def save_upload(f: UploadFile, dest: Path) -> int:
+	"""Copy an upload to disk chunk by chunk and return the number of bytes written."""
+	dest.parent.mkdir(parents=True, exist_ok=True)
+	written = 0
+	f.file.seek(0)
+	with open(dest, "wb") as out:
+		while True:
+			block = f.file.read(INGEST_CHUNK_BYTES)
+			if not block:
+				break
+			out.write(block)
+			written += len(block)
+	return written
+
+
+def iter_files_to_comments(files: Iterable[Tuple[str, BinaryIO]]) -> Iterator[Dict[str, Any]]:
+	"""Stream normalized comments out of (filename, binary file) pairs one at a time.
+
+	Only a digest of each cleaned text is kept for duplicate detection, so memory
+	stays bounded by the chunk size rather than the upload size.
+	"""
+	seen = set()
+	for name, fileobj in files:
+		name = name or "uploaded"
+		chunks = iter_text_chunks(fileobj)
 		if name.lower().endswith(".csv"):
-			items.extend(parse_csv(text, name))
+			parsed = parse_csv(chunks, name)
 		elif name.lower().endswith(".json"):
-			items.extend(parse_json(text, name))
+			parsed = parse_json(chunks, name)
 		else:
-			items.extend(parse_txt(text, name))
-	if not items:
-		raise HTTPException(status_code=400, detail="No comments parsed from files")
-	# normalize
-	out: List[Dict[str, Any]] = []
-	seen = set()
+			parsed = parse_txt(chunks, name)
+		for it in parsed:
+			text = clean_text(str(it.get("text", "")))
+			if not text:
+				continue
+			key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+			dup = key in seen
+			seen.add(key)
+			yield {"text": text, "file": it.get("file"), "duplicate": dup, "text_hash": key.hex()}
+
+
+def iter_saved_uploads(uploads: List[Dict[str, str]]) -> Iterator[Tuple[str, BinaryIO]]:
+	"""Open persisted uploads lazily, one at a time, as (original name, file) pairs."""
+	for up in uploads:
+		with open(up["path"], "rb") as fh:
+			yield up["name"], fh
+
+
+def iter_batches(items: Iterable[Any], size: int = INGEST_BATCH_SIZE) -> Iterator[List[Any]]:
+	batch: List[Any] = []
 	for it in items:
-		text = clean_text(str(it.get("text", "")))
-		if not text:
-			continue
-		key = text
-		dup = key in seen
-		seen.add(key)
-		out.append({"text": text, "file": it.get("file"), "duplicate": dup})
-	return out
-
-
-def parse_csv(text: str, filename: str) -> List[Dict[str, Any]]:
-	rows = []
+		batch.append(it)
+		if len(batch) >= size:
+			yield batch
+			batch = []
+	if batch:
+		yield batch
+
+
+def parse_csv(chunks: Iterable[str], filename: str) -> Iterator[Dict[str, Any]]:
 	import csv
-	reader = csv.DictReader(io.StringIO(text))
+	reader = csv.DictReader(iter_lines(chunks))
 	if "text" not in (reader.fieldnames or []):
 		raise HTTPException(status_code=400, detail=f"CSV missing 'text' column in {filename}")
 	for row in reader:
-		rows.append({"id": row.get("comment_id") or row.get("id"), "text": row.get("text", ""), "file": filename})
-	return rows
+		yield {"id": row.get("comment_id") or row.get("id"), "text": row.get("text", ""), "file": filename}
+
 
+def parse_json(chunks: Iterable[str], filename: str) -> Iterator[Dict[str, Any]]:
+	"""Incrementally decode a top-level JSON array, yielding one element at a time.
 
-def parse_json(text: str, filename: str) -> List[Dict[str, Any]]:
-	try:
-		arr = json.loads(text)
-	except Exception:
+	As strict as ``json.loads``: elements need exactly one comma between them and
+	only whitespace may follow the closing bracket.
+	"""
+	decoder = json.JSONDecoder()
+	buf = ""
+	# "start": expecting "[", "first": element or "]", "value": element, "sep": "," or "]", "end": whitespace only
+	state = "start"
+	for chunk in chunks:
+		buf += chunk
+		pos = 0
+		while True:
+			while pos < len(buf) and buf[pos].isspace():
+				pos += 1
+			if pos >= len(buf):
+				break
+			ch = buf[pos]
+			if state == "start":
+				if ch != "[":
+					raise HTTPException(status_code=400, detail=f"JSON must be an array in {filename}")
+				state = "first"
+				pos += 1
+			elif state == "end":
+				raise HTTPException(status_code=400, detail=f"Invalid JSON in {filename}")
+			elif state == "sep" or (state == "first" and ch == "]"):
+				if ch not in ",]":
+					raise HTTPException(status_code=400, detail=f"Invalid JSON in {filename}")
+				state = "value" if ch == "," else "end"
+				pos += 1
+			else:
+				if ch in ",]":
+					raise HTTPException(status_code=400, detail=f"Invalid JSON in {filename}")
+				if ch not in '{["' and not _SCALAR_END_RE.search(buf, pos):
+					# A bare number/literal may continue in the next chunk
+					break
+				try:
+					obj, pos = decoder.raw_decode(buf, pos)
+				except json.JSONDecodeError:
+					# Most likely the element continues in the next chunk
+					break
+				state = "sep"
+				if isinstance(obj, dict) and "text" in obj:
+					yield {"id": obj.get("id"), "text": obj.get("text", ""), "file": filename}
+		buf = buf[pos:]
+		if len(buf) > MAX_JSON_ELEMENT_CHARS:
+			raise HTTPException(status_code=400, detail=f"Invalid JSON in {filename}")
+	# Stream ended before the closing bracket (or was empty)
+	if state != "end" or buf.strip():
 		raise HTTPException(status_code=400, detail=f"Invalid JSON in {filename}")
-	if not isinstance(arr, list):
-		raise HTTPException(status_code=400, detail=f"JSON must be an array in {filename}")
-	out = []
-	for obj in arr:
-		if not isinstance(obj, dict) or "text" not in obj:
-			continue
-		out.append({"id": obj.get("id"), "text": obj.get("text", ""), "file": filename})
-	return out
-
-
-def parse_txt(text: str, filename: str) -> List[Dict[str, Any]]:
-	lines = [ln.strip() for ln in text.splitlines()]
-	return [{"text": ln, "file": filename} for ln in lines if ln]
+
+
+def parse_txt(chunks: Iterable[str], filename: str) -> Iterator[Dict[str, Any]]:
+	for line in iter_lines(chunks):
+		for ln in line.splitlines():
+			ln = ln.strip()
+			if ln:
+				yield {"text": ln, "file": filename}
 
 
 def compute_sentiment_counts(labels: List[str]) -> Dict[str, int]:
@@ -688,18 +688,12 @@ if (
 
       const data = await res.json();
 
-      updateStatus(
-        "Sentiment done, generating summaries & wordcloud...",
-        "Please wait while we process your data",
-        80
-      );
-
       const aid = data.analysis.id;
       localStorage.setItem("lastAnalysisId", aid);
 
       updateStatus(
-        "Initial Analysis Complete!",
-        "Redirecting to dashboard - summaries are still being generated...",
+        "Upload received!",
+        "Redirecting to dashboard - sentiment and summaries are being generated...",
         100
       );
 
@@ -1339,7 +1333,10 @@ if (location.pathname.endsWith("/frontend/dashboard.html")) {
       (c) => c.summary_status === "pending"
     );
 
-    if (data.analysis.status === "done" && !hasPending && pollId) {
+    const isTerminal =
+      (data.analysis.status === "done" && !hasPending) ||
+      data.analysis.status === "failed";
+    if (isTerminal && pollId) {
       clearInterval(pollId);
       pollId = null;
     }
@@ -1848,12 +1845,17 @@ if (location.pathname.endsWith("/frontend/dashboard.html")) {
     commentsContainer.innerHTML = "";
 
     // Get progress from analysis meta
-    const progress = analysisMeta?.summarization_progress || 0;
+    // Sentiment runs before summarization; show whichever stage is active
+    const isAnalyzing =
+      analysisStatus === "uploaded" || analysisStatus === "processing";
+    const progress = isAnalyzing
+      ? analysisMeta?.sentiment_progress || 0
+      : analysisMeta?.summarization_progress || 0;
     const isSummarizing = analysisStatus === "summarizing";
 
-    // Add overall progress indicator in header if summarizing or completing
+    // Add overall progress indicator in header if analyzing, summarizing or completing
     const shouldShowProgress =
-      isSummarizing || (progress > 0 && progress < 100);
+      isAnalyzing || isSummarizing || (progress > 0 && progress < 100);
 
     if (shouldShowProgress) {
       // Check if progress header already exists
@@ -1884,6 +1886,15 @@ if (location.pathname.endsWith("/frontend/dashboard.html")) {
         targetProgress = 0;
       }
 
+      const stageTitle = isAnalyzing ? "Analyzing sentiment" : "Summarizing";
+      const titleEl = progressHeader.querySelector(".progress-title");
+      if (titleEl && titleEl.dataset.stage !== stageTitle) {
+        titleEl.innerHTML = `<div class="progress-spinner"></div> ${stageTitle}`;
+        titleEl.dataset.stage = stageTitle;
+        currentProgress = 0;
+        targetProgress = 0;
+      }
+
       // Always animate to the new progress value (smooth update)
       animateProgress(progress);
     } else if (
@@ -2058,6 +2069,8 @@ if (location.pathname.endsWith("/frontend/dashboard.html")) {
               <span class="icon icon-chart"></span> Sentiment: ${
                 analysis.sentiment_model === "roberta"
                   ? "RoBERTa (3-class)"
+                  : analysis.sentiment_model === "cascade"
+                  ? "Cascade (DistilBERT → RoBERTa)"
                   : "DistilBERT (2-class)"
               }
             </span>
@@ -2070,6 +2083,12 @@ if (location.pathname.endsWith("/frontend/dashboard.html")) {
                       analysis.meta.summary_model);
                   return name ? `Gemini (${name})` : "Gemini API";
                 }
+                if (analysis.summary_model === "hybrid") {
+                  return "Gemini + Gemma3:1b (Hedged)";
+                }
+                if (analysis.summary_model === "local") {
+                  return "Extractive (Local, CPU)";
+                }
                 return "Gemma3:1b (Local)";
               })()}
             </span>
@@ -2126,6 +2145,8 @@ if (location.pathname.endsWith("/frontend/dashboard.html")) {
               <span class="icon icon-chart"></span> Sentiment: ${
                 analysis.sentiment_model === "roberta"
                   ? "RoBERTa (3-class)"
+                  : analysis.sentiment_model === "cascade"
+                  ? "Cascade (DistilBERT → RoBERTa)"
                   : "DistilBERT (2-class)"
               }
             </span>
@@ -2138,6 +2159,12 @@ if (location.pathname.endsWith("/frontend/dashboard.html")) {
                       analysis.meta.summary_model);
                   return name ? `Gemini (${name})` : "Gemini API";
                 }
+                if (analysis.summary_model === "hybrid") {
+                  return "Gemini + Gemma3:1b (Hedged)";
+                }
+                if (analysis.summary_model === "local") {
+                  return "Extractive (Local, CPU)";
+                }
                 return "Gemma3:1b (Local)";
               })()}
             </span>
@@ -20,6 +20,10 @@ if exist "requirements.txt" (
     pip install -r requirements.txt
 )
 
+REM Download sentiment models into the local model store (data\models)
+echo Prefetching sentiment models...
+python -m backend.model_store prefetch
+
 REM Setup completed
 echo Setup completed. 
 echo Now run launch.bat to start the server